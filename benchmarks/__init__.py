@@ -0,0 +1,23 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       benchmarks/__init__.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+
+Seeded, headless benchmarks of the engine, the gameplay renderer and the particle systems.
+
+A benchmark is a `setup()` returning `(run, units)`: `run()` does `units` of work (ticks, frames...) and is the
+only part that is timed. Every repeat gets a fresh setup, so repeats are independent and identical.
+"""
+
+import os
+
+# Rendering benchmarks draw into offscreen surfaces, no window or sound device is needed.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
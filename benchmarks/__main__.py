@@ -0,0 +1,126 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       benchmarks/__main__.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+
+Runs the benchmarks from the repository root, writes the results as JSON and compares them with a saved baseline.
+
+    python -m benchmarks --out baseline.json
+    python -m benchmarks --baseline baseline.json --threshold 0.1
+
+A benchmark regresses when its median time grows by more than `--threshold` over the baseline, the exit status is
+then 1.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+import functools
+import statistics
+
+import numpy as np
+import pygame
+
+from benchmarks         import engine, render
+from src.particle       import ParticleSystem
+
+
+BENCHMARKS : dict = {
+    "engine.steps"          : (engine.steps,        "ticks"),
+    "engine.near_full"      : (engine.near_full,    "ticks"),
+    "engine.line_clears"    : (engine.line_clears,  "boards"),
+    "engine.placements"     : (engine.placements,   "peaces"),
+    "render.gameplay_dirty" : (render.gameplay_dirty, "frames"),
+    "render.gameplay_full"  : (render.gameplay_full,  "frames"),
+}
+
+for count in (100, 1000, 10000):
+    for renderer in ParticleSystem.RENDERERS:
+        BENCHMARKS["particles.%s.%d" % (renderer, count)] = (functools.partial(render.particles, count, renderer), "frames")
+
+
+def measure(setup, repeat : int) -> dict:
+    times = []
+    for _ in range(repeat):
+        run, units = setup()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    best = min(times)
+    return {
+        "units"   : units,
+        "times"   : times,
+        "best"    : best,
+        "median"  : statistics.median(times),
+        "rate"    : units / best,
+    }
+
+
+def compare(results : dict, baseline : dict, threshold : float) -> list:
+    """ Prints current against baseline medians, returns the names of the regressed benchmarks. """
+    regressed = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print("{:<28} {:>10.2f} ms   (new)".format(name, result["median"] * 1000))
+            continue
+
+        change = result["median"] / old["median"] - 1
+        status = "REGRESSED" if change > threshold else "faster" if change < -threshold else ""
+        if status == "REGRESSED":
+            regressed.append(name)
+        print("{:<28} {:>10.2f} ms {:>10.2f} ms {:>+8.1%}  {}".format(name, old["median"] * 1000, result["median"] * 1000, change, status))
+    return regressed
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the Misaka Tetris benchmarks.")
+    parser.add_argument("--repeat",    type=int,   default=5,    help="timed runs of every benchmark, the median is compared")
+    parser.add_argument("--filter",    type=str,   default="",   help="only run benchmarks whose name contains this")
+    parser.add_argument("--out",       type=str,   default=None, help="JSON file for the results")
+    parser.add_argument("--baseline",  type=str,   default=None, help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1,  help="relative slow down that counts as a regression")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args    = parse_args()
+    results = {}
+    for name, (setup, unit) in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        results[name] = dict(measure(setup, args.repeat), unit=unit)
+        print("{:<28} {:>10.2f} ms {:>12.0f} {}/s".format(name, results[name]["median"] * 1000, results[name]["rate"], unit), file=sys.stderr)
+
+    report = {
+        "python"     : platform.python_version(),
+        "pygame"     : pygame.version.ver,
+        "numpy"      : np.__version__,
+        "machine"    : platform.platform(),
+        "repeat"     : args.repeat,
+        "benchmarks" : results,
+    }
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressed = compare(results, json.load(file)["benchmarks"], args.threshold)
+        if regressed:
+            print("regressed: " + ", ".join(regressed), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
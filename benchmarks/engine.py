@@ -0,0 +1,129 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       benchmarks/engine.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import random
+
+from src.actions    import Action
+from src.bitboard   import Bitboard
+from src.bus        import GameEvent
+from src.constants  import Constants
+from src.placements import enumerate_placements
+from src.policies   import GreedyPolicy
+from src.systems    import GameplaySystem
+
+SEED  = 1234
+TICKS = 20000
+
+
+def garbage(board : Bitboard, rows : int, rng : random.Random) -> None:
+    """ Fills the bottom `rows` rows with blocks, leaving one hole per row. """
+    for i in range(board.rows - rows, board.rows):
+        hole = rng.randrange(board.cols)
+        for j in range(board.cols):
+            if j != hole:
+                board.set(i, j, rng.randrange(2, 9))
+
+
+def steps():
+    """ `GameplaySystem.update` with a fixed stream of random actions, the cost of the rules alone. """
+    rng     = random.Random(SEED)
+    system  = GameplaySystem(seed=SEED)
+    actions = [(rng.choice(list(Action)),) for _ in range(TICKS)]
+
+    def run():
+        for action in actions:
+            system.update(Constants.TICK, action)
+    return run, TICKS
+
+
+def rise(board : Bitboard, depth : int, rng : random.Random) -> None:
+    """ Pushes garbage rows in from the bottom until the stack is `depth` rows high again. """
+    rows = depth - (board.rows - min(board.tops))
+    if rows <= 0:
+        return
+
+    risen = Bitboard(board.rows, board.cols)
+    for i in range(max(rows, board.rows - depth), board.rows):
+        for j, value in enumerate(board.colors[i]):
+            if value:
+                risen.set(i - rows, j, value)
+    garbage(risen, rows, rng)
+    board.load(risen)
+
+
+def near_full():
+    """
+    A greedy player on a board kept 15 rows deep in garbage, collision and drop checks near the top. Garbage
+    rises from the bottom whenever clears bring the stack lower, always right after a spawn so it never pushes
+    into the falling peace.
+    """
+    rng     = random.Random(SEED)
+    system  = GameplaySystem(auto_reset=False, seed=SEED)
+    policy  = GreedyPolicy(SEED)
+    spawned = []
+    system.bus.subscribe(GameEvent.Spawn, lambda peace: spawned.append(peace))
+    garbage(system.board, 15, rng)
+
+    def run():
+        for _ in range(TICKS // 4):
+            if spawned:
+                spawned.clear()
+                rise(system.board, 15, rng)
+                if system.check_for_end():
+                    system.over = True
+            if system.over:
+                system.reset()
+                garbage(system.board, 15, rng)
+            system.update(Constants.TICK, (policy.act(system),))
+    return run, TICKS // 4
+
+
+def line_clears():
+    """ Boards with one to four full rows among the garbage, the cost of finding, scoring and removing them. """
+    rng    = random.Random(SEED)
+    system = GameplaySystem(seed=SEED)
+    boards = []
+    for i in range(1000):
+        board = Bitboard(Constants.ROWS, Constants.COLS)
+        garbage(board, 12, rng)
+        for row in rng.sample(range(Constants.ROWS - 12, Constants.ROWS), i % 4 + 1):
+            for j in range(Constants.COLS):
+                board.set(row, j, rng.randrange(2, 9))
+        boards.append(board)
+
+    def run():
+        for board in boards:
+            system.board.load(board)
+            system.check_for_cleared_lines()
+    return run, len(boards)
+
+
+def placements():
+    """ `enumerate_placements` from the spawn of every peace of a greedy game, what a bot pays per peace. """
+    system = GameplaySystem(seed=SEED)
+    policy = GreedyPolicy(SEED)
+    spawns = []
+
+    def spawned(peace : str) -> None:
+        board = Bitboard(Constants.ROWS, Constants.COLS)
+        board.load(system.board)
+        spawns.append((board, peace, system.rotation, system.cursor[Constants.X], system.cursor[Constants.Y]))
+
+    system.bus.subscribe(GameEvent.Spawn, spawned)
+    while len(spawns) < 500:
+        system.update(Constants.TICK, (policy.act(system),))
+
+    def run():
+        for spawn in spawns:
+            enumerate_placements(*spawn)
+    return run, len(spawns)
@@ -0,0 +1,83 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       benchmarks/render.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import pygame
+
+from pygame                 import Surface
+from src.assets             import Assets
+from src.constants          import Constants
+from src.events             import EventHandler
+from src.particle           import ParticleSystem, BackgroundParticleSystem
+from src.policies           import GreedyPolicy
+from src.screens.gameplay   import GameplayScreen
+from src.sfx                import SoundEffects
+
+SEED            = 1234
+FRAMES          = 300
+PARTICLE_FRAMES = 200
+
+assets : Assets = None
+
+
+def init() -> Assets:
+    """ A hidden display (needed by `convert_alpha`) and one set of assets shared by every benchmark. """
+    global assets
+    if assets is None:
+        pygame.display.init()
+        pygame.font.init()
+        pygame.display.set_mode((1, 1))
+        assets = Assets()
+    return assets
+
+
+def gameplay(full : bool):
+    """ Frames of a greedy game drawn into an offscreen surface, `full` redraws the whole screen every frame. """
+    assets  = init()
+    surface = Surface(Constants.SCREEN_SIZE)
+    events  = EventHandler()
+    screen  = GameplayScreen(surface, assets, events, SoundEffects(assets), seed=SEED)
+    policy  = GreedyPolicy(SEED)
+
+    def run():
+        for _ in range(FRAMES):
+            screen.system.step(policy.act(screen.system))
+            screen.update(Constants.TICK)
+            if full:
+                screen.invalidate()
+            screen.render(0.5)
+    return run, FRAMES
+
+
+def gameplay_dirty():
+    return gameplay(False)
+
+
+def gameplay_full():
+    return gameplay(True)
+
+
+def particles(count : int, renderer : str):
+    """ `BackgroundParticleSystem` update and render of `count` particles with one of `ParticleSystem.RENDERERS`. """
+    init()
+    surface = Surface(Constants.SCREEN_SIZE)
+    system  = BackgroundParticleSystem(Constants.SCREEN_SIZE[0], Constants.SCREEN_SIZE[1], count, count, SEED)
+
+    def run():
+        previous, ParticleSystem.renderer = ParticleSystem.renderer, renderer
+        try:
+            for _ in range(PARTICLE_FRAMES):
+                system.update(Constants.TICK)
+                system.render(surface, 0.5)
+        finally:
+            ParticleSystem.renderer = previous
+    return run, PARTICLE_FRAMES
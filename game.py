@@ -11,8 +11,10 @@ Distributed under the MIT software license, see the accompanying file LICENCE or
 ---------------------------------------------------------------------------------------------------------------------------------------
 """
 
+import random
 import pygame
 import pickle
+import argparse
 
 from pygame                import Surface
 from pygame.time           import Clock
@@ -22,52 +24,186 @@ from src.assets            import Assets
 from src.events            import EventHandler
 from src.settings          import Settings
 from src.screens.gameplay  import GameplayScreen
+from src.screens.splash    import SplashScreen
 from src.states            import GlobalStates
+from src.replay            import ReplayWriter, ReplayPlayer
+from src.particle          import ParticleSystem
+from src.music             import MusicPlayer
+from src.sfx               import SoundEffects
+from src.latency           import LatencyMonitor
+from src.profiler          import FrameProfiler
 
 class Game(object):
 
-    def __init__(self) -> None:
-        self.surface       : Surface      = pygame.display.set_mode(Constants.SCREEN_SIZE, pygame.DOUBLEBUF)
+    def __init__(self, record : str = None, replay : str = None, vsync : bool = False, latency : str = None, profile : str = None) -> None:
+        self.surface       : Surface      = self.create_surface(vsync)
         self.clock         : Clock        = pygame.time.Clock()
         self.delta         : float        = 0
+        self.accumulator   : float        = 0
         self.assets        : Assets       = Assets()
         self.event_handler : EventHandler = EventHandler()
-
-        self.screens : dict = {
-            "Gameplay": GameplayScreen(self.surface, self.assets, self.event_handler)
-        }
+        self.player        : ReplayPlayer = ReplayPlayer(replay) if replay else None
+        self.recorder      : ReplayWriter = None
+        self.latency       : LatencyMonitor = LatencyMonitor(latency) if latency else None
+        self.profiler      : FrameProfiler  = FrameProfiler(path=profile) if profile else None
+        self.music         : MusicPlayer  = MusicPlayer(Constants.PLAYLIST, Constants.MUSIC_VOLUME, Constants.MUSIC_FADE)
+        self.sfx           : SoundEffects = SoundEffects(self.assets, Constants.SFX_CHANNELS)
 
         pygame.display.set_caption('Misaka Tetris')
         pygame.display.set_icon(pygame.image.load("./assets/icon.png"))
 
+        self.screens : dict = {}
+        self.load(GameplayScreen.ASSETS + (("font_24",) if latency else ()) + (("font_consolas",) if profile else ()))
+
+        seed = self.player.seed if self.player else random.randrange(1 << 32)
+
+        self.screens["Gameplay"] = GameplayScreen(self.surface, self.assets, self.event_handler, self.sfx, seed, self.player)
+
+        self.screens["Gameplay"].latency = self.latency
+
+        if self.profiler:
+            self.profile()
+
+        if record:
+            system        = self.screens["Gameplay"].system
+            self.recorder = ReplayWriter(record, seed, system.source.name)
+            system.recorder = self.recorder
+
+
+    def create_surface(self, vsync : bool) -> Surface:
+        if vsync:
+            try:
+                # SDL only honours vsync on renderer backed windows, which pygame creates for SCALED.
+                return pygame.display.set_mode(Constants.SCREEN_SIZE, pygame.DOUBLEBUF | pygame.SCALED, vsync=1)
+            except pygame.error:
+                pass
+        return pygame.display.set_mode(Constants.SCREEN_SIZE, pygame.DOUBLEBUF)
+
+
+    def load(self, names : tuple) -> None:
+        """ Shows the splash screen until every asset in `names` is loaded, closing the window stops the game. """
+        splash = SplashScreen(self.surface, self.assets, names)
+        while GlobalStates.Running and not splash.done():
+            self.clock.tick(Constants.MAX_FPS)
+            self.poll_events()
+            splash.update(Constants.TICK)
+            splash.render(0)
+            pygame.display.flip()
+
+        # Keys pressed on the splash screen are not meant for the game.
+        self.event_handler.clear()
+
 
     def run(self) -> None:
+        """
+        Logic runs in fixed `Constants.TICK` steps fed by an accumulator, rendering runs once per frame capped at
+        `Constants.MAX_FPS`. After a stall at most `MAX_CATCH_UP` ticks are run, the rest of the backlog is dropped.
+        """
         while GlobalStates.Running:
-            self.delta = self.clock.tick() / 1000.0
-            
-            self.poll_events()      
-            self.surface.fill(Color.LightBlack)
+            self.delta       = self.clock.tick(Constants.MAX_FPS) / 1000.0
+            self.accumulator = min(self.accumulator + self.delta, Constants.TICK * Constants.MAX_CATCH_UP)
 
-            self.screens[GlobalStates.Screen].render(self.delta)
+            self.poll_events()
+            self.music.update(self.delta)
+            screen = self.screens[GlobalStates.Screen]
 
-            pygame.display.flip()
+            while self.accumulator >= Constants.TICK:
+                screen.update(Constants.TICK)
+                self.accumulator -= Constants.TICK
+
+            rects = screen.render(self.accumulator / Constants.TICK)
+            self.present(rects)
+
+            if self.profiler:
+                self.profiler.frame()
+
+
+    def present(self, rects : list) -> None:
+        """ Draws the enabled overlays over the frame and shows it. """
+        if self.latency:
+            rect = self.latency.draw(self.surface, self.assets.font_24)
+            if rects is not None: rects.append(rect)
+        if self.profiler and self.profiler.visible:
+            rect = self.profiler.draw(self.surface, self.assets.font_consolas)
+            if rects is not None: rects.append(rect)
+
+        self.flip(rects)
+
+        if self.latency:
+            self.latency.present()
+
+
+    def flip(self, rects : list) -> None:
+        if rects is None: pygame.display.flip()
+        else:             pygame.display.update(rects)
+
+
+    def profile(self) -> None:
+        """ Puts the frame stages of the game and its screens under the profiler. """
+        self.profiler.wrap(self, "poll_events", "events")
+        self.profiler.wrap(self.music, "update", "music")
+        self.profiler.wrap(self, "flip", "display")
+        for screen in self.screens.values():
+            screen.profile(self.profiler)
+
+
+    def close(self) -> None:
+        self.music.stop()
+        self.sfx.stop()
+        if self.latency:
+            self.latency.dump()
+        if self.profiler:
+            self.profiler.dump()
+        system = self.screens["Gameplay"].system
+        if self.recorder:
+            self.recorder.close(system)
+        if self.player:
+            if   self.player.verify(system): print("Replay verified")
+            elif not self.player.done:       print("Replay did not finish")
+            elif self.player.truncated:      print("Replay unverified, the recording has no footer")
+            else:                            print("Replay MISMATCH")
+
+
+    def toggle_profiler(self) -> None:
+        self.profiler.visible = not self.profiler.visible
+        if not self.profiler.visible:
+            self.screens[GlobalStates.Screen].invalidate()
 
 
     def poll_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:    GlobalStates.Running = False
+            if event.type == pygame.WINDOWEXPOSED and GlobalStates.Screen in self.screens: self.screens[GlobalStates.Screen].invalidate()
             if event.type == pygame.KEYDOWN: self.event_handler.handle_key_events(event, True )
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and self.profiler: self.toggle_profiler()
             if event.type == pygame.KEYUP:   self.event_handler.handle_key_events(event, False)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Misaka Tetris")
+    parser.add_argument("--record", type=str, default=None, help="record the session into a replay file")
+    parser.add_argument("--replay", type=str, default=None, help="play a recorded session back in real time")
+    parser.add_argument("--vsync",  action="store_true",   help="sync frames to the display refresh")
+    parser.add_argument("--music",  action="store_true",   help="start with the background music on")
+    parser.add_argument("--latency", type=str, default=None, help="measure input to display latency, show it and write a report to this file")
+    parser.add_argument("--profile", type=str, default=None, help="time every stage of a frame, F3 toggles the graph, the last 600 frames are written to this CSV file")
+    parser.add_argument("--particle-renderer", choices=ParticleSystem.RENDERERS, default=ParticleSystem.renderer, help="how particles are drawn")
+    args = parser.parse_args()
+
+    ParticleSystem.renderer = args.particle_renderer
+    Settings.Music          = Settings.Music or args.music
+
     pygame.mixer.pre_init(44100, -16, 2, 2048)
     pygame.init()
     pygame.mixer.init()
     pygame.joystick.init()
 
-    game = Game()
-    game.run()
+    game = Game(args.record, args.replay, args.vsync, args.latency, args.profile)
+    try:
+        game.run()
+    finally:
+        # Also on a crash, so the recording gets its footer and the reports are written.
+        game.close()
 
     pygame.quit()
     pygame.mixer.quit()
@@ -0,0 +1,87 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       selfplay.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+
+Plays headless games with a policy on every core and streams one CSV line per finished game.
+
+    python selfplay.py --games 1000 --policy greedy --seed 0 --out results.csv
+
+Game `i` of a run always uses seed `--seed + i`, for both the peaces and the policy, so a run (or any single game
+of it) can be reproduced with a different worker count.
+"""
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+import multiprocessing
+
+from src.systems    import GameplaySystem
+from src.policies   import load_policy
+from src.randomizer import GENERATORS
+
+
+FIELDS : tuple = ("seed", "score", "lines", "level", "ticks")
+
+
+def play_game(task : tuple) -> tuple:
+    seed, policy_name, generator, delta, max_ticks = task
+
+    system = GameplaySystem(auto_reset=False, seed=seed, generator=generator)
+    policy = load_policy(policy_name)(seed)
+
+    while not system.over and system.ticks < max_ticks:
+        system.update(delta, (policy.act(system),))
+
+    return (seed, system.score, system.cleared_lines, system.level, system.ticks)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run headless Misaka Tetris games in parallel.")
+    parser.add_argument("--games",     type=int,   default=100,          help="number of games to play")
+    parser.add_argument("--seed",      type=int,   default=0,            help="seed of the first game, game i uses seed + i")
+    parser.add_argument("--policy",    type=str,   default="greedy",     help="policy name (idle, random, greedy) or module:Class")
+    parser.add_argument("--generator", type=str,   default="uniform",    help="peace randomizer: " + ", ".join(GENERATORS))
+    parser.add_argument("--workers",   type=int,   default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--tick",      type=float, default=1 / 60,       help="simulated seconds per tick")
+    parser.add_argument("--max-ticks", type=int,   default=1_000_000,    help="stop a game after this many ticks")
+    parser.add_argument("--out",       type=str,   default=None,         help="CSV file for the results (default stdout)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args  = parse_args()
+    tasks = [(args.seed + i, args.policy, args.generator, args.tick, args.max_ticks) for i in range(args.games)]
+
+    start  = time.perf_counter()
+    scores = []
+    ticks  = 0
+    # stdout is left open, only a file given with --out is closed.
+    with open(args.out, "w") if args.out else contextlib.nullcontext(sys.stdout) as out:
+        out.write(",".join(FIELDS) + "\n")
+
+        with multiprocessing.Pool(args.workers) as pool:
+            # Small chunks keep every core busy even when game lengths vary a lot.
+            for result in pool.imap_unordered(play_game, tasks, chunksize=max(1, args.games // (args.workers * 16))):
+                out.write(",".join(str(value) for value in result) + "\n")
+                out.flush()
+                scores.append(result[1])
+                ticks += result[4]
+
+    elapsed = time.perf_counter() - start
+
+    print("{} games, mean score {:.1f}, {:.1f} games/s, {:.0f} ticks/s on {} workers".format(
+        len(scores), sum(scores) / max(1, len(scores)), len(scores) / elapsed, ticks / elapsed, args.workers), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/actions.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+from enum import Enum
+
+
+class Action(Enum):
+    Nothing   = 0
+    Left      = 1
+    Right     = 2
+    RotateCW  = 3
+    RotateCCW = 4
+    SoftDrop  = 5
+    HardDrop  = 6
+    Hold      = 7
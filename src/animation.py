@@ -0,0 +1,103 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/animation.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import math
+
+
+def linear(t : float) -> float:
+    return t
+
+
+def ease_out(t : float) -> float:
+    return 1 - (1 - t) ** 2
+
+
+def pulse(t : float) -> float:
+    """ Goes out to `end` and back to `start`, for bounces and shakes. """
+    return math.sin(math.pi * t)
+
+
+class Tween(object):
+    """ Moves a value from `start` to `end` over `duration` seconds along `easing`, after waiting `delay` seconds. """
+
+    def __init__(self, start : float, end : float, duration : float, easing = linear, delay : float = 0, done = None) -> None:
+        self.start    : float = start
+        self.end      : float = end
+        self.duration : float = duration
+        self.easing           = easing
+        self.elapsed  : float = -delay
+        self.done             = done      # Called once when the tween finishes.
+
+
+    @property
+    def finished(self) -> bool:
+        return self.elapsed >= self.duration
+
+
+    @property
+    def value(self) -> float:
+        t = min(max(self.elapsed / self.duration, 0), 1) if self.duration > 0 else 1
+        return self.start + (self.end - self.start) * self.easing(t)
+
+
+    def update(self, delta : float) -> None:
+        self.elapsed += delta
+
+
+class Timeline(object):
+    """
+    Named tweens advanced together by the screen that owns them. Starting a tween under a name that is still
+    playing replaces it. Only presentation state lives here, the game rules never wait for a tween.
+    """
+
+    def __init__(self) -> None:
+        self.tweens : dict = {}
+
+
+    def play(self, name : str, tween : Tween) -> Tween:
+        self.tweens[name] = tween
+        return tween
+
+
+    def active(self, name : str) -> bool:
+        return name in self.tweens
+
+
+    def value(self, name : str, default : float = 0) -> float:
+        tween = self.tweens.get(name)
+        return tween.value if tween else default
+
+
+    def finish(self, name : str) -> None:
+        """ Ends the tween `name` now, calling its `done`, if it is playing. """
+        tween = self.tweens.pop(name, None)
+        if tween and tween.done:
+            tween.done()
+
+
+    def update(self, delta : float) -> None:
+        """ Advances every tween, drops the finished ones and then calls their `done`. """
+        finished = []
+        for name, tween in list(self.tweens.items()):
+            tween.update(delta)
+            if tween.finished:
+                del self.tweens[name]
+                finished.append(tween)
+
+        for tween in finished:
+            if tween.done:
+                tween.done()
+
+
+    def clear(self) -> None:
+        self.tweens.clear()
@@ -1,50 +1,129 @@
-
+import io
+import os
 import pygame
 
-from pygame.mixer import Channel
-from pygame       import Surface
+from concurrent.futures import ThreadPoolExecutor
+from pygame             import Surface
+from src.text           import TextCache
+from src.atlas          import BlockAtlas
+from src.cache          import AssetCache
+
+
+def decode_image(cache : AssetCache, path : str, size : tuple) -> Surface:
+    return cache.image(path, size)
+
+def finish_image(surface : Surface, path : str, size : tuple) -> Surface:
+    return surface.convert_alpha()
+
+def decode_blocks(cache : AssetCache, path : str, count : int) -> list:
+    return [cache.image(path + "/" + str(i) + ".png") for i in range(1, count + 1)]
+
+def finish_blocks(images : list, path : str, count : int) -> BlockAtlas:
+    return BlockAtlas([image.convert_alpha() for image in images])
+
+def decode_sound(cache : AssetCache, path : str, volume : float) -> pygame.mixer.Sound:
+    return cache.sound(path)
+
+def finish_sound(sound : pygame.mixer.Sound, path : str, volume : float) -> pygame.mixer.Sound:
+    if volume is not None:
+        sound.set_volume(volume)
+    return sound
+
+def decode_font(cache : AssetCache, path : str, size : int) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+def finish_font(data : bytes, path : str, size : int) -> pygame.font.Font:
+    # SDL_ttf is not thread safe, only the file is read in the background.
+    return pygame.font.Font(io.BytesIO(data), size)
+
+
+IMAGE  : tuple = (decode_image,  finish_image)
+BLOCKS : tuple = (decode_blocks, finish_blocks)
+SOUND  : tuple = (decode_sound,  finish_sound)
+FONT   : tuple = (decode_font,   finish_font)
+
+# name: (kind, path, argument). `decode` (file, cache, scaling) runs on a loader thread, `finish` (convert, volume) on
+# the main thread.
+ASSETS : dict = {
+    "main_menu_logo_image"      : (IMAGE,  "./assets/main_menu_logo.png", None),
+    "main_menu_misaka_image"    : (IMAGE,  "./assets/misaka3.png",        None),
+    "settings_background_image" : (IMAGE,  "./assets/settings4.png",      (1227, 700)),
+    "logo_image"                : (IMAGE,  "./assets/Untitled.png",       None),
+    "misaka_image"              : (IMAGE,  "./assets/mil.png",            (1150, 710)),
+    "blocks"                    : (BLOCKS, "./assets/blocks",             9),
+
+    "drop_sound"                : (SOUND,  "./assets/drop.wav",           0.1),
+    "clear_sound"               : (SOUND,  "./assets/clear.mp3",          0.08),
+    "select_sound"              : (SOUND,  "./assets/select.wav",         0.08),
+    "enter_sound"               : (SOUND,  "./assets/enter.wav",          0.09),
+
+    "font_24"                   : (FONT,   "./assets/font.ttf",           24),
+    "font_32"                   : (FONT,   "./assets/font.ttf",           32),
+    "font_48"                   : (FONT,   "./assets/font.ttf",           48),
+    "font_64"                   : (FONT,   "./assets/font.ttf",           64),
+    "font_consolas"             : (FONT,   "./assets/font1.TTF",          12),
+}
+
 
 class Assets(object):
+    """
+    Every entry of `ASSETS` is an attribute loaded on first use. `preload(names)` decodes them on a thread pool
+    instead, `poll()` finishes the decoded ones on the main thread and reports progress, so a splash screen can
+    animate while a screen's manifest loads. Touching an attribute that is still in flight waits for it.
+
+    Images and sounds are decoded through `cache`, so warm starts map preconverted pixels and PCM from disk.
+    """
 
-    def __init__(self) -> None:
-        self.init_video()
-        self.init_audio()
-        self.init_fonts()
-       
-    def init_video(self) -> None:
+    def __init__(self, cache : AssetCache = None) -> None:
+        self.cache     : AssetCache         = cache or AssetCache()
+        self.pending   : dict               = {}
+        self.requested : set                = set()
+        self.pool      : ThreadPoolExecutor = None
+        self.text      : TextCache          = TextCache()
 
-        self.main_menu_logo_image       : Surface = pygame.image.load("./assets/main_menu_logo.png").convert_alpha()
-        self.main_menu_misaka_image     : Surface = pygame.image.load("./assets/misaka3.png"       ).convert_alpha()
+    def __getattr__(self, name : str):
+        if name not in ASSETS or "pending" not in self.__dict__:
+            raise AttributeError(name)
 
-        self.settings_background_image  : Surface = pygame.transform.scale(pygame.image.load("./assets/settings4.png"  ).convert_alpha() ,(1227, 700) )
+        (decode, _), path, argument = ASSETS[name]
+        future = self.pending.get(name)
+        return self.finish(name, future.result() if future else decode(self.cache, path, argument))
 
-        self.logo_image       : Surface = pygame.image.load("./assets/Untitled.png").convert_alpha()
-        self.misaka_image     : Surface = pygame.transform.scale(pygame.image.load("./assets/mil.png" ).convert_alpha(), (1150, 710))
+    @property
+    def block_images(self) -> list:
+        return self.blocks.images
 
-        self.block_images     : list    = []
-        for i in range(1, 10):
-            self.block_images.append(pygame.image.load("./assets/blocks/" + str(i) +".png").convert_alpha())
+    def loaded(self, name : str) -> bool:
+        return name in self.__dict__
 
+    def finish(self, name : str, data):
+        (_, finish), path, argument = ASSETS[name]
+        self.pending.pop(name, None)
+        value = self.__dict__[name] = finish(data, path, argument)
+        return value
 
+    def preload(self, names : tuple) -> None:
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="assets")
 
+        for name in names:
+            if not self.loaded(name) and name not in self.pending:
+                (decode, _), path, argument = ASSETS[name]
+                self.pending[name] = self.pool.submit(decode, self.cache, path, argument)
+        self.requested.update(names)
 
-    def init_audio(self) -> None:
-        self.channel1 : Channel = pygame.mixer.Channel(0)
-        self.channel2 : Channel = pygame.mixer.Channel(1)
+    def poll(self) -> float:
+        """ Finishes the background loads that are done, returns the loaded fraction of everything preloaded. """
+        for name, future in list(self.pending.items()):
+            if future.done():
+                self.finish(name, future.result())
+        return self.progress()
 
-        self.drop_sound  = pygame.mixer.Sound("./assets/drop.wav" ) 
-        self.bg_music    = pygame.mixer.Sound("./assets/bg1.mp3" ) 
-        self.clear_sound = pygame.mixer.Sound("./assets/clear.mp3") 
-        self.select_sound = pygame.mixer.Sound("./assets/select.wav") 
-        self.enter_sound = pygame.mixer.Sound("./assets/enter.wav") 
-        self.enter_sound.set_volume(0.09)
-        self.drop_sound.set_volume(0.1)
-        self.select_sound.set_volume(0.08)
-        self.clear_sound.set_volume(0.08)
+    def progress(self) -> float:
+        if not self.requested:
+            return 1.0
+        return sum(self.loaded(name) for name in self.requested) / len(self.requested)
 
-    def init_fonts(self) -> None:
-        self.font_24 = pygame.font.Font('./assets/font.ttf', 24)
-        self.font_32 = pygame.font.Font('./assets/font.ttf', 32)
-        self.font_48 = pygame.font.Font('./assets/font.ttf', 48)
-        self.font_64 = pygame.font.Font('./assets/font.ttf', 64)
-        self.font_consolas = pygame.font.Font('./assets/font1.ttf', 12)
\ No newline at end of file
+    def ready(self, names : tuple) -> bool:
+        return all(self.loaded(name) for name in names)
@@ -0,0 +1,59 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/atlas.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import pygame
+
+from pygame import Surface, Rect
+
+
+class BlockAtlas(object):
+    """
+    Block images packed side by side into one `sheet`. `images[i]` is a subsurface sharing the sheet's pixels and
+    `areas[i]` its rect, so a whole field can go to `Surface.blits()` as (sheet, position, area) in one call.
+
+    Other block sizes are scaled from the original images once, on the first `scaled(size)`, and shared by every
+    atlas of the family.
+    """
+
+    def __init__(self, images : list, size : int = None) -> None:
+        self.originals : list    = images
+        self.size      : int     = size or images[0].get_width()
+        self.sheet     : Surface = Surface((self.size * len(images), self.size), pygame.SRCALPHA).convert_alpha()
+        self.areas     : list    = []
+        self.images    : list    = []
+        self.scales    : dict    = { self.size: self }
+
+        for i, image in enumerate(images):
+            if image.get_size() != (self.size, self.size):
+                image = pygame.transform.smoothscale(image, (self.size, self.size))
+
+            area = Rect(i * self.size, 0, self.size, self.size)
+            self.sheet.blit(image, area)
+            self.areas.append(area)
+            self.images.append(self.sheet.subsurface(area))
+
+
+    def scaled(self, size : int) -> "BlockAtlas":
+        if size not in self.scales:
+            atlas        = BlockAtlas(self.originals, size)
+            atlas.scales = self.scales
+            self.scales[size] = atlas
+        return self.scales[size]
+
+
+    def batch(self, cells : list, size : int = None) -> list:
+        """ (index, column, row) cells to `Surface.blits()` arguments on a grid of `size` pixels (default the block size). """
+        size  = size or self.size
+        sheet = self.sheet
+        areas = self.areas
+        return [(sheet, (column * size, row * size), areas[index]) for index, column, row in cells]
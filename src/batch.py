@@ -0,0 +1,279 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/batch.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import numpy as np
+
+from src.actions   import Action
+from src.constants import Constants
+from src.peaces    import PEACE_NAMES, PEACE_SHAPES
+
+
+ROWS   : int = Constants.ROWS
+COLS   : int = Constants.COLS
+OFFSET : int = 2                        # Cursor x of -OFFSET maps to column 0 of the shape tables.
+DEPTH  : int = 4                        # Rows of the tallest peace, also the height of the floor padding.
+FULL   : int = (1 << COLS) - 1
+
+
+def build_shape_tables() -> tuple:
+    """ Flattens `PEACE_SHAPES` into arrays indexed by [peace, rotation, x + OFFSET]. """
+    peaces  = len(PEACE_NAMES)
+    masks   = np.zeros((peaces, 4, COLS + OFFSET * 2, DEPTH), dtype=np.uint16)
+    valid   = np.zeros((peaces, 4, COLS + OFFSET * 2),        dtype=bool)
+    widths  = np.zeros((peaces, 4),                           dtype=np.int16)
+    heights = np.zeros((peaces, 4),                           dtype=np.int16)
+
+    for p, name in enumerate(PEACE_NAMES):
+        for r, shape in enumerate(PEACE_SHAPES[name]):
+            widths [p, r] = shape.width
+            heights[p, r] = shape.height
+            for x, rows in shape.shifted.items():
+                valid[p, r, x + OFFSET] = True
+                for i, mask in rows:
+                    masks[p, r, x + OFFSET, i] = mask
+
+    return masks, valid, widths, heights
+
+
+SHAPE_MASKS, SHAPE_VALID, SHAPE_WIDTHS, SHAPE_HEIGHTS = build_shape_tables()
+
+SPAN       : int        = COLS + OFFSET * 2
+WINDOW     : np.ndarray = np.arange(DEPTH)
+FLAT_MASKS : np.ndarray = SHAPE_MASKS.reshape(-1, DEPTH)     # [peace, rotation, x] folded into one index, one gather instead of three.
+FLAT_VALID : np.ndarray = SHAPE_VALID.reshape(-1)
+SCORES     : np.ndarray = np.array(Constants.SCORES, dtype=np.int64)
+
+
+class BatchGameplaySystem(object):
+    """
+    `count` independent games following the `GameplaySystem` rules, advanced in lockstep with NumPy.
+
+    Every board is a row of `boards`, stored as one uint16 bitmask per playfield row plus `DEPTH` full rows of
+    floor padding, so collision for all games is a gather, an `and` and an `any`. Colors are not tracked, the
+    batch is meant for bots and analytics, not for drawing.
+
+    `step(actions)` applies one `Action` value per game and then advances time by `delta`, exactly like
+    `GameplaySystem.update(delta, [action])`. It returns the games that ended during the step. With `auto_reset`
+    those games restart at the beginning of the next step, so their final score can still be read in between.
+    """
+
+    def __init__(self, count : int, seed : int = None, auto_reset : bool = True) -> None:
+        self.count      : int                   = count
+        self.rng        : np.random.Generator   = np.random.default_rng(seed)
+        self.auto_reset : bool                  = auto_reset
+        self.all        : np.ndarray            = np.arange(count)
+
+        self.boards     : np.ndarray = np.zeros((count, ROWS + DEPTH), dtype=np.uint16)
+        self.flat       : np.ndarray = self.boards.reshape(-1)
+        self.peace      : np.ndarray = np.zeros(count, dtype=np.int16)
+        self.rotation   : np.ndarray = np.zeros(count, dtype=np.int16)
+        self.x          : np.ndarray = np.zeros(count, dtype=np.int16)
+        self.y          : np.ndarray = np.zeros(count, dtype=np.int16)
+        self.next_peace : np.ndarray = np.zeros(count, dtype=np.int16)
+        self.hold_peace : np.ndarray = np.zeros(count, dtype=np.int16)
+        self.can_hold   : np.ndarray = np.zeros(count, dtype=bool)
+        self.over       : np.ndarray = np.zeros(count, dtype=bool)
+
+        self.fall_timer : np.ndarray = np.zeros(count, dtype=np.float64)
+        self.down_timer : np.ndarray = np.zeros(count, dtype=np.float64)
+        self.ticks      : np.ndarray = np.zeros(count, dtype=np.int64)
+        self.score      : np.ndarray = np.zeros(count, dtype=np.int64)
+        self.lines      : np.ndarray = np.zeros(count, dtype=np.int64)
+        self.level      : np.ndarray = np.zeros(count, dtype=np.int64)
+        self.inc_level  : np.ndarray = np.zeros(count, dtype=np.int64)
+
+        self.reset()
+
+
+    def reset(self, games : np.ndarray = None) -> None:
+        """ Starts new games, for every game or for the given indices / boolean mask. """
+        idx = self.all if games is None else self.indices(games)
+
+        self.boards    [idx, :ROWS] = 0
+        self.boards    [idx, ROWS:] = FULL
+        self.hold_peace[idx]        = -1
+        self.over      [idx]        = False
+        self.fall_timer[idx]        = 1
+        self.ticks     [idx]        = 0
+        self.score     [idx]        = 0
+        self.lines     [idx]        = 0
+        self.level     [idx]        = 0
+        self.inc_level [idx]        = 0
+        self.next_peace[idx]        = self.draw(len(idx))
+
+        self.spawn(idx)
+
+
+    def indices(self, games : np.ndarray) -> np.ndarray:
+        games = np.asarray(games)
+        return np.flatnonzero(games) if games.dtype == bool else games
+
+
+    def draw(self, count : int) -> np.ndarray:
+        return self.rng.integers(0, len(PEACE_NAMES), size=count)
+
+
+    def step(self, actions : np.ndarray, delta : float = 1 / 60) -> np.ndarray:
+        if self.auto_reset and self.over.any():
+            self.reset(self.over)
+
+        actions = np.asarray(actions)
+        ended   = self.over.copy()
+        live    = ~self.over
+
+        self.hold      (np.flatnonzero(live & (actions == Action.Hold.value     )))
+        self.hard_drop (np.flatnonzero(live & (actions == Action.HardDrop.value )))
+        self.shift     (np.flatnonzero(live & (actions == Action.Left.value     )), -1)
+        self.shift     (np.flatnonzero(live & (actions == Action.Right.value    )),  1)
+        self.move_down (np.flatnonzero(live & (actions == Action.SoftDrop.value )))
+        self.rotate    (np.flatnonzero(live & (actions == Action.RotateCW.value )),  1)
+        self.rotate    (np.flatnonzero(live & (actions == Action.RotateCCW.value)), -1)
+
+        live = ~self.over
+        self.down_timer[live] += delta
+        self.ticks     [live] += 1
+        self.move_down(np.flatnonzero(live & (self.down_timer >= self.fall_timer)))
+
+        return self.over & ~ended
+
+
+    def collides(self, idx : np.ndarray, peace : np.ndarray, rotation : np.ndarray, x : np.ndarray, y : np.ndarray) -> np.ndarray:
+        shape = (peace * 4 + rotation) * SPAN + x + OFFSET
+        rows  = self.flat[(idx * (ROWS + DEPTH) + y)[:, None] + WINDOW]
+        return ~FLAT_VALID[shape] | (rows & FLAT_MASKS[shape]).any(axis=1)
+
+
+    def spawn(self, idx : np.ndarray) -> None:
+        self.peace     [idx] = self.next_peace[idx]
+        self.rotation  [idx] = 0
+        self.x         [idx] = COLS // 2 - SHAPE_WIDTHS[self.peace[idx], 0] // 2
+        self.y         [idx] = 0
+        self.next_peace[idx] = self.draw(len(idx))
+        self.down_timer[idx] = 0
+        self.can_hold  [idx] = True
+
+        self.over[idx] |= self.collides(idx, self.peace[idx], self.rotation[idx], self.x[idx], self.y[idx])
+
+
+    def hold(self, idx : np.ndarray) -> None:
+        idx   = idx[self.can_hold[idx]]
+        if not len(idx):
+            return
+
+        held  = self.hold_peace[idx]
+        empty = held < 0
+
+        peace = np.where(empty, self.next_peace[idx], held)
+        zero  = np.zeros(len(idx), dtype=np.int16)
+        x     = COLS // 2 - SHAPE_WIDTHS[peace, 0] // 2
+        fits  = ~self.collides(idx, peace, zero, x, zero)
+
+        # With an empty hold slot the next peace spawns, so a blocked spawn ends the game like it does in `GameplaySystem`.
+        drawn = idx[empty]
+        self.next_peace[drawn] = self.draw(len(drawn))
+        self.down_timer[drawn] = 0
+        self.over[idx[empty & ~fits]] = True
+
+        ok, peace, x = idx[fits], peace[fits], x[fits]
+        self.hold_peace[ok] = self.peace[ok]
+        self.peace     [ok] = peace
+        self.rotation  [ok] = 0
+        self.x         [ok] = x
+        self.y         [ok] = 0
+        self.can_hold  [ok] = False
+
+
+    def shift(self, idx : np.ndarray, direction : int) -> None:
+        if not len(idx):
+            return
+
+        x  = self.x[idx] + direction
+        ok = ~self.collides(idx, self.peace[idx], self.rotation[idx], x, self.y[idx])
+        self.x[idx[ok]] = x[ok]
+
+
+    def rotate(self, idx : np.ndarray, direction : int) -> None:
+        if not len(idx):
+            return
+
+        peace    = self.peace[idx]
+        rotation = (self.rotation[idx] + direction) % 4
+        width    = SHAPE_WIDTHS[peace, rotation]
+        x        = np.clip(self.x[idx], 0, COLS - width)
+        y        = self.y[idx]
+
+        ok = (y + SHAPE_HEIGHTS[peace, rotation] <= ROWS)
+        ok[ok] = ~self.collides(idx[ok], peace[ok], rotation[ok], x[ok], y[ok])
+
+        self.rotation[idx[ok]] = rotation[ok]
+        self.x       [idx[ok]] = x[ok]
+
+
+    def move_down(self, idx : np.ndarray) -> None:
+        if not len(idx):
+            return
+
+        self.down_timer[idx] = 0
+        y       = self.y[idx] + 1
+        blocked = self.collides(idx, self.peace[idx], self.rotation[idx], self.x[idx], y)
+
+        self.y[idx[~blocked]] = y[~blocked]
+        self.lock(idx[blocked])
+
+
+    def hard_drop(self, idx : np.ndarray) -> None:
+        moving = idx
+        while len(moving):
+            y       = self.y[moving] + 1
+            free    = ~self.collides(moving, self.peace[moving], self.rotation[moving], self.x[moving], y)
+            moving  = moving[free]
+            self.y[moving] = y[free]
+
+        self.lock(idx)
+
+
+    def lock(self, idx : np.ndarray) -> None:
+        if not len(idx):
+            return
+
+        masks = SHAPE_MASKS[self.peace[idx], self.rotation[idx], self.x[idx] + OFFSET]
+        rows  = self.y[idx, None] + np.arange(DEPTH)
+        self.boards[idx[:, None], rows] |= masks
+
+        self.clear_lines(idx)
+        self.spawn(idx)
+
+
+    def clear_lines(self, idx : np.ndarray) -> None:
+        full    = self.boards[idx, :ROWS] == FULL
+        cleared = full.sum(axis=1)
+        hit     = cleared > 0
+        if not hit.any():
+            return
+
+        idx, full, cleared = idx[hit], full[hit], cleared[hit]
+
+        # A stable sort on "not full" moves the full rows to the top and keeps the others in order, the top rows are then emptied.
+        order  = np.argsort(~full, axis=1, kind="stable")
+        boards = np.take_along_axis(self.boards[idx, :ROWS], order, axis=1)
+        boards[np.arange(ROWS) < cleared[:, None]] = 0
+        self.boards[idx, :ROWS] = boards
+
+        self.lines    [idx] += cleared
+        self.score    [idx] += (self.level[idx] + 1) * SCORES[cleared - 1]
+        self.inc_level[idx] += cleared
+
+        up = idx[self.inc_level[idx] >= 10]
+        self.inc_level [up] -= 10
+        self.level     [up] += 1
+        self.fall_timer[up] -= self.level[up] * 0.01
@@ -0,0 +1,207 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/bitboard.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import bisect
+
+from src.peaces import PeaceShape
+
+
+class BitboardRow(object):
+    """ Read/write view over one row of a bitboard, indexed like the old `tetris_field[i]` lists. """
+
+    __slots__ = ("board", "index")
+
+    def __init__(self, board : "Bitboard", index : int) -> None:
+        self.board : Bitboard = board
+        self.index : int      = index
+
+    def __getitem__(self, col : int) -> int:
+        return self.board.colors[self.index][col]
+
+    def __setitem__(self, col : int, value : int) -> None:
+        self.board.set(self.index, col, value)
+
+    def __len__(self) -> int:
+        return self.board.cols
+
+    def __iter__(self):
+        return iter(self.board.colors[self.index])
+
+
+class Bitboard(object):
+    """
+    Playfield where every row is an integer bitmask (bit `j` set means column `j` is occupied), with a parallel
+    color plane of one byte per cell. The masks are the source of truth for collision, locking and line checks,
+    the color plane only tells the renderer which block image to draw.
+
+    Peaces are passed in as precompiled `PeaceShape` records whose masks are already shifted to every legal
+    column, so testing or placing a peace costs one `and` or `or` per occupied peace row.
+
+    `filled` holds the complete rows, kept up to date as cells are set, so line clears never scan the board.
+    """
+
+    def __init__(self, rows : int, cols : int) -> None:
+        self.rows  : int  = rows
+        self.cols  : int  = cols
+        self.full  : int  = (1 << cols) - 1
+        self.field : list = [BitboardRow(self, i) for i in range(rows)]
+
+        self.reset()
+
+
+    def reset(self) -> None:
+        self.masks   : list = [0 for _ in range(self.rows)]
+        self.colors  : list = [bytearray(self.cols) for _ in range(self.rows)]
+        self.tops    : list = [self.rows for _ in range(self.cols)]   # Highest occupied row of every column, `rows` when empty.
+        self.filled  : set  = set()                                   # Rows with every cell occupied.
+        self.version : int  = 0                                       # Bumped on every change, lets callers cache derived data.
+
+
+    def get(self, row : int, col : int) -> int:
+        return self.colors[row][col]
+
+
+    def set(self, row : int, col : int, value : int) -> None:
+        self.colors[row][col] = value
+        self.version         += 1
+
+        if value:
+            self.masks[row] |= (1 << col)
+            if row < self.tops[col]:
+                self.tops[col] = row
+            if self.masks[row] == self.full:
+                self.filled.add(row)
+        else:
+            self.masks[row] &= ~(1 << col)
+            self.filled.discard(row)
+            if row == self.tops[col]:
+                self.refresh_tops()
+
+
+    def collides(self, shape : PeaceShape, x : int, y : int) -> bool:
+        """ True if `shape` placed with its top left corner at (x, y) leaves the board or overlaps a block. """
+        rows = shape.shifted.get(x)
+        if rows is None or y + shape.box[1] < 0 or y + shape.box[3] >= self.rows:
+            return True
+
+        masks = self.masks
+        for i, mask in rows:
+            if masks[y + i] & mask:
+                return True
+        return False
+
+
+    def drop_distance(self, shape : PeaceShape, x : int, y : int) -> int:
+        """
+        Number of rows `shape` can fall from (x, y) before it lands, -1 if it already collides there.
+
+        While every column of the peace is above the surface of the stack this is just the smallest gap between
+        the peace's bottom profile and the column tops. A peace tucked under an overhang falls back to stepping
+        down one row at a time.
+        """
+        distance = self.rows
+        for j, bottom in enumerate(shape.bottoms):
+            if bottom < 0:
+                continue
+            gap = self.tops[x + j] - (y + bottom) - 1
+            if gap < 0:
+                break
+            if gap < distance:
+                distance = gap
+        else:
+            return distance
+
+        if self.collides(shape, x, y):
+            return -1
+
+        distance = 0
+        while not self.collides(shape, x, y + distance + 1):
+            distance += 1
+        return distance
+
+
+    def place(self, shape : PeaceShape, x : int, y : int, value : int) -> None:
+        for i, mask in shape.shifted[x]:
+            self.masks[y + i] |= mask
+            if self.masks[y + i] == self.full:
+                self.filled.add(y + i)
+        for j, i in shape.cells:
+            self.colors[y + i][x + j] = value
+            if y + i < self.tops[x + j]:
+                self.tops[x + j] = y + i
+        self.version += 1
+
+
+    def full_rows(self) -> list:
+        return sorted(self.filled)
+
+
+    def remove_rows(self, indices : list) -> None:
+        """
+        Removes the rows in one pass from the lowest removed row up to the top of the stack, every surviving row is
+        moved once into its final place and the rows left over at the top are emptied. Rows below the lowest removed
+        one and above the stack are not touched, the lists never change length. The column tops are moved the same
+        way instead of being recomputed, only a column whose top row was removed looks for its next block.
+        """
+        removed = sorted(set(indices))
+        if not removed:
+            return
+
+        empty = len(removed)
+        tops  = self.tops
+        top   = min(min(tops), removed[0])
+        for j in range(self.cols):
+            row = tops[j]
+            if row in removed:
+                bit = 1 << j
+                while row < self.rows and (row in removed or not self.masks[row] & bit):
+                    row += 1
+            tops[j] = row if row == self.rows else row + empty - bisect.bisect_right(removed, row)
+
+        self.filled = { i + empty - bisect.bisect_right(removed, i) for i in self.filled if i not in removed }
+
+        # Bottom up, the rows between two removed ones move down as one slice by the number of removed rows below.
+        masks, colors = self.masks, self.colors
+        for k in range(empty - 1, -1, -1):
+            low, high, shift = removed[k - 1] + 1 if k else top, removed[k], empty - k
+            if low < high:
+                masks [low + shift:high + shift] = masks [low:high]
+                colors[low + shift:high + shift] = colors[low:high]
+        masks [top:top + empty] = [0] * empty
+        colors[top:top + empty] = [bytearray(self.cols) for _ in range(empty)]
+        self.version += 1
+
+
+    def load(self, other : "Bitboard") -> None:
+        """ Copies the cells of a board of the same size into this one. """
+        self.masks    = list(other.masks)
+        self.colors   = [bytearray(row) for row in other.colors]
+        self.tops     = list(other.tops)
+        self.filled   = set(other.filled)
+        self.version += 1
+
+
+    def refresh_tops(self) -> None:
+        """ Recomputes the column tops, walking down only until every column has been seen. """
+        self.tops = [self.rows for _ in range(self.cols)]
+        seen      = 0
+        for i, mask in enumerate(self.masks):
+            new = mask & ~seen
+            while new:
+                low = new & -new
+                self.tops[low.bit_length() - 1] = i
+                new ^= low
+            seen |= mask
+            if seen == self.full:
+                break
+
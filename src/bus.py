@@ -0,0 +1,40 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/bus.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+from enum import Enum
+
+
+class GameEvent(Enum):
+    Spawn    = 0    # peace : str
+    Hold     = 1    # peace : str
+    HardDrop = 2    # peace : str, cursor : list (top left corner where the peace landed)
+    Lock     = 3    # peace : str, cursor : list
+    Clear    = 4    # rows  : list (still on the board while listeners run), score : int, level : int
+    GameOver = 5    # score : int, lines : int, level : int, ticks : int
+
+
+class EventBus(object):
+    """ Minimal publish/subscribe hub. The gameplay rules emit on it, sounds, particles and tools listen. """
+
+    def __init__(self) -> None:
+        self.listeners : dict = {}
+
+    def subscribe(self, event : GameEvent, listener) -> None:
+        self.listeners.setdefault(event, []).append(listener)
+
+    def unsubscribe(self, event : GameEvent, listener) -> None:
+        self.listeners.get(event, []).remove(listener)
+
+    def emit(self, event : GameEvent, **payload) -> None:
+        for listener in self.listeners.get(event, ()):
+            listener(**payload)
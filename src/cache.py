@@ -0,0 +1,113 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/cache.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import os
+import mmap
+import struct
+import hashlib
+import pygame
+
+from pygame import Surface
+
+MAGIC   = b"MTAC"
+VERSION = 1
+HEADER  = struct.Struct("<4sH20sII")   # magic, version, source digest, width / sample count, height / unused
+
+
+class AssetCache(object):
+    """
+    Decoded assets stored as raw buffers under `directory`, one file per (source path, target format). The header
+    keeps a digest of the source file, so an edited asset is decoded again and its entry rewritten. Hits are
+    memory-mapped, images come back as `RGBA` surfaces ready for `convert_alpha`, sounds as mixer-format PCM.
+
+    Every failure to read or write the cache falls back to decoding, a missing or read-only directory only costs
+    the speed up.
+    """
+
+    def __init__(self, directory : str = ".cache") -> None:
+        self.directory : str = directory
+        self.hits      : int = 0
+        self.misses    : int = 0
+
+
+    def path(self, source : str, target : str) -> str:
+        name = hashlib.sha1((source + "|" + target).encode()).hexdigest()[:20]
+        return os.path.join(self.directory, name + ".bin")
+
+
+    def digest(self, source : str) -> bytes:
+        with open(source, "rb") as file:
+            return hashlib.sha1(file.read()).digest()
+
+
+    def read(self, source : str, target : str) -> tuple:
+        """ (width, height, buffer) of a valid entry, or None. """
+        try:
+            with open(self.path(source, target), "rb") as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        if len(data) < HEADER.size:
+            return None
+
+        magic, version, digest, width, height = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION or digest != self.digest(source):
+            return None
+        return width, height, memoryview(data)[HEADER.size:]
+
+
+    def write(self, source : str, target : str, width : int, height : int, buffer : bytes) -> None:
+        path = self.path(source, target)
+        temp = path + "." + str(os.getpid()) + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp, "wb") as file:
+                file.write(HEADER.pack(MAGIC, VERSION, self.digest(source), width, height))
+                file.write(buffer)
+            os.replace(temp, path)
+        except OSError:
+            pass
+
+
+    def image(self, source : str, size : tuple = None) -> Surface:
+        """ The image at `source` scaled to `size`, decoded from the cache when the source did not change. """
+        target = "RGBA" + (str(size) if size else "")
+        entry  = self.read(source, target)
+        if entry:
+            self.hits += 1
+            width, height, buffer = entry
+            return pygame.image.frombuffer(buffer, (width, height), "RGBA")
+
+        self.misses += 1
+        surface = pygame.image.load(source)
+        if size:
+            surface = pygame.transform.scale(surface, size)
+
+        self.write(source, target, *surface.get_size(), pygame.image.tobytes(surface, "RGBA"))
+        return surface
+
+
+    def sound(self, source : str) -> pygame.mixer.Sound:
+        """ The sound at `source` in the current mixer format, decoded from the cache when the source did not change. """
+        target = "PCM" + str(pygame.mixer.get_init())
+        entry  = self.read(source, target)
+        if entry:
+            self.hits += 1
+            return pygame.mixer.Sound(buffer=entry[2])
+
+        self.misses += 1
+        sound = pygame.mixer.Sound(source)
+        raw   = sound.get_raw()
+        self.write(source, target, len(raw), 0, raw)
+        return sound
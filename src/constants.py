@@ -9,7 +9,19 @@ class Constants:
     X                       : int   = 0
     Y                       : int   = 1
     MAX_FPS                 : int   = 120
+    TICK_RATE               : int   = 60
+    TICK                    : float = 1 / TICK_RATE
+    MAX_CATCH_UP            : int   = 5
     DAS                     : float = 0.1
+    ARR                     : float = 0.05
+    SOFT_DROP               : float = 0.04
+    PREVIEW                 : int   = 5
+    PARTICLES               : int   = 100
+    MAX_DIRTY_RECTS         : int   = 1000
+    PLAYLIST                : list  = [ "./assets/bg1.mp3", "./assets/bg.mp3" ]
+    MUSIC_VOLUME            : float = 0.3
+    MUSIC_FADE              : float = 1.5
+    SFX_CHANNELS            : int   = 8
     MOVE_DIR                : dict  = { "left": -1, "right": 1 }
     BLOCK_DISPLAY_OFFSETS_X : dict  = { "T": 32, "L": 32, "J": 32, "O": 48, "I": 16, "S": 32, "Z": 32 }
     BLOCK_DISPLAY_OFFSETS_Y : dict  = { "T": 64, "L": 32, "J": 64, "O": 64, "I": 48, "S": 32, "Z": 32 }
@@ -0,0 +1,145 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/controls.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+from enum          import Enum
+
+from src.actions   import Action
+from src.constants import Constants
+from src.events    import EventHandler, InputEvent
+
+
+class ShiftState(Enum):
+    Idle      = 0
+    Charging  = 1   # held, waiting out the delay
+    Repeating = 2   # held past the delay, repeating
+
+
+class AutoShift(object):
+    """
+    Auto repeat of one held key: one `action` on press, another after `delay` seconds of holding and then one every
+    `rate` seconds. A rate of 0 repeats `limit` times at once (to the wall). Time held counts from the OS event,
+    not from the tick that handled it, so `held` is how long before the end of that tick the key went down.
+    """
+
+    def __init__(self, action : Action, delay : float, rate : float, limit : int = Constants.COLS) -> None:
+        self.action : Action     = action
+        self.delay  : float      = delay
+        self.rate   : float      = rate
+        self.limit  : int        = limit
+        self.state  : ShiftState = ShiftState.Idle
+        self.timer  : float      = 0
+
+
+    def press(self, held : float, actions : list) -> None:
+        self.state = ShiftState.Charging
+        self.timer = held
+        actions.append(self.action)
+
+
+    def release(self) -> None:
+        self.state = ShiftState.Idle
+        self.timer = 0
+
+
+    def update(self, delta : float, actions : list) -> None:
+        if self.state == ShiftState.Idle:
+            return
+
+        self.timer += delta
+        if self.state == ShiftState.Charging:
+            if self.timer < self.delay:
+                return
+            self.state  = ShiftState.Repeating
+            self.timer -= self.delay
+            actions.extend([self.action] * (self.limit if self.rate <= 0 else 1))
+        elif self.rate <= 0:
+            # Already at the wall, one action per tick keeps it there when the board changes.
+            actions.append(self.action)
+
+        if self.rate <= 0:
+            self.timer = 0
+            return
+
+        while self.timer >= self.rate:
+            self.timer -= self.rate
+            actions.append(self.action)
+
+
+class KeyboardController(object):
+    """
+    Turns one `InputSnapshot` per tick into `Action`s. Every press in the snapshot counts, so taps shorter than a
+    frame are not lost. Left and right run their own `AutoShift` (DAS / ARR), the most recently pressed direction
+    wins while both are held and releasing it hands over to the other one. `stamps` holds, for each action of the
+    last poll, the time of the key event that caused it. Auto repeats get None, they answer no key event and their
+    delay is the DAS / ARR timing, not latency.
+    """
+
+    def __init__(self, events : EventHandler) -> None:
+        self.events    : EventHandler = events
+        self.shifts    : dict         = {
+            "left" : AutoShift(Action.Left,     Constants.DAS,       Constants.ARR),
+            "right": AutoShift(Action.Right,    Constants.DAS,       Constants.ARR),
+            "down" : AutoShift(Action.SoftDrop, Constants.SOFT_DROP, Constants.SOFT_DROP, Constants.ROWS),
+        }
+        self.taps      : dict         = { "c": Action.Hold, "space": Action.HardDrop, "up": Action.RotateCW, "z": Action.RotateCCW }
+        self.direction : list         = []    # held horizontal keys, most recent last
+        self.stamps    : list         = []
+
+
+    def poll(self, delta : float) -> list:
+        snapshot = self.events.snapshot()
+        actions  = []
+        stamps   = []
+
+        for event in snapshot.events:
+            count = len(actions)
+            self.handle(event, snapshot.time - event.time - delta, actions)
+            stamps.extend([event.time] * (len(actions) - count))
+
+        for shift in self.shifts.values():
+            count = len(actions)
+            shift.update(delta, actions)
+            stamps.extend([None] * (len(actions) - count))
+
+        self.stamps = stamps
+        return actions
+
+
+    def handle(self, event : InputEvent, held : float, actions : list) -> None:
+        if event.key in self.taps:
+            if event.down:
+                actions.append(self.taps[event.key])
+            return
+
+        if event.key == "down":
+            if event.down: self.shifts["down"].press(held, actions)
+            else:          self.shifts["down"].release()
+            return
+
+        if event.key not in ("left", "right"):
+            return
+
+        if event.key in self.direction:
+            self.direction.remove(event.key)
+        if event.down:
+            self.direction.append(event.key)
+
+        for side in ("left", "right"):
+            if side not in self.direction[-1:]:
+                self.shifts[side].release()
+
+        if event.down:
+            self.shifts[event.key].press(held, actions)
+        elif self.direction:
+            # Back to the direction still held, it has to charge again before repeating.
+            self.shifts[self.direction[-1]].state = ShiftState.Charging
@@ -1,27 +1,65 @@
+import time
 import pygame
 
-from src.states   import GlobalStates
 from pygame.event import Event
 
+KEYS : dict = { pygame.K_DOWN: "down", pygame.K_LEFT: "left", pygame.K_RIGHT: "right", pygame.K_UP: "up", pygame.K_z: "z",
+                pygame.K_SPACE: "space", pygame.K_c: "c", pygame.K_p: "p", pygame.K_RETURN: "enter" }
+
+class InputEvent(object):
+
+    def __init__(self, key : str, down : bool, time : float) -> None:
+        self.key  : str   = key
+        self.down : bool  = down
+        self.time : float = time    # `time.perf_counter()` when the event was taken off the OS queue
+
+
+class InputSnapshot(object):
+    """ Everything that happened to the keys since the previous snapshot, in order, and which keys are held now. """
+
+    def __init__(self, events : list, held : dict, time : float) -> None:
+        self.events : list  = events
+        self.held   : dict  = held
+        self.time   : float = time
+
+    def pressed(self, key : str) -> int:
+        return sum(1 for event in self.events if event.down and event.key == key)
+
+
 class EventHandler(object):
+    """
+    Collects key events into a timestamped queue, so presses and releases that happen within one frame are all kept.
+    The game reads it once per frame through `snapshot()`, menus through `key()`, which consumes one press of a key.
+    """
 
     def __init__(self) -> None:
-        self.keys : dict  = { "down": False, "left": False, "right": False, "up": False, "z": False, "space": False, "c": False, "p": False,
-                              "enter": False }
+        self.keys    : dict  = { key: False for key in KEYS.values() }
+        self.presses : dict  = { key: 0     for key in KEYS.values() }
+        self.queue   : list  = []
 
-    def key(self, k : str) -> None:
-        if self.keys[k]:
-            self.keys[k] = False
+    def key(self, k : str) -> bool:
+        if self.presses[k]:
+            self.presses[k] -= 1
             return True
         return False
 
-    def handle_key_events(self, event : Event, down : bool) -> None:
-        if event.key == pygame.K_DOWN:  self.keys["down"]   = down
-        if event.key == pygame.K_LEFT:  self.keys["left"]   = down; GlobalStates.FIRST_MOVE[0] = down 
-        if event.key == pygame.K_RIGHT: self.keys["right"]  = down; GlobalStates.FIRST_MOVE[1] = down 
-        if event.key == pygame.K_UP:    self.keys["up"]     = down
-        if event.key == pygame.K_SPACE: self.keys["space"]  = down 
-        if event.key == pygame.K_z:     self.keys["z"]      = down
-        if event.key == pygame.K_c:     self.keys["c"]      = down
-        if event.key == pygame.K_p:     self.keys["p"]      = down
-        if event.key == pygame.K_RETURN:self.keys["enter"]  = down
\ No newline at end of file
+    def handle_key_events(self, event : Event, down : bool, stamp : float = None) -> None:
+        key = KEYS.get(event.key)
+        if key is None or (down and self.keys[key]):
+            return
+
+        self.keys[key] = down
+        self.queue.append(InputEvent(key, down, time.perf_counter() if stamp is None else stamp))
+        if down:
+            self.presses[key] += 1
+
+    def snapshot(self) -> InputSnapshot:
+        snapshot = InputSnapshot(self.queue, dict(self.keys), time.perf_counter())
+        self.clear()
+        return snapshot
+
+    def clear(self) -> None:
+        """ Drops the queued events and unread presses, input that arrived while nothing could act on it. """
+        self.queue = []
+        for key in self.presses:
+            self.presses[key] = 0
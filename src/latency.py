@@ -0,0 +1,110 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/latency.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import json
+import time
+import numpy as np
+
+from pygame         import Surface, Rect
+from pygame.font    import Font
+from src.systems    import GameplaySystem
+from src.colors     import Color
+
+PERCENTILES = (50, 95, 99)
+BUCKET      = 2       # ms, histogram bucket width
+BUCKETS     = 100     # the last bucket takes everything slower
+
+
+class LatencyMonitor(object):
+    """
+    Input to present latency. `update` stands in for `GameplaySystem.update` and applies the actions one at a time,
+    every action that changed the game state leaves the timestamp of its key event pending (auto repeats have none
+    and are not sampled), `present` (called right after the display update) turns the pending stamps into samples.
+    The time until the display actually lights up is not visible to the game, with vsync it is about one refresh
+    more.
+
+    The game only creates a monitor when asked to, otherwise the hooks are a None check.
+    """
+
+    def __init__(self, path : str = None) -> None:
+        self.path     : str     = path
+        self.pending  : list    = []
+        self.samples  : list    = []      # seconds
+        self.label    : Surface = None
+        self.refresh  : float   = 0
+
+
+    @staticmethod
+    def state(system : GameplaySystem) -> tuple:
+        return (tuple(system.cursor), system.rotation, system.current_peace, system.hold_peace, system.board.version)
+
+
+    def update(self, system : GameplaySystem, delta : float, actions : list, stamps : list) -> None:
+        for action, stamp in zip(actions, stamps):
+            before = self.state(system)
+            system.step(action)
+            if stamp is not None and self.state(system) != before:
+                self.pending.append(stamp)
+        system.tick(delta)
+
+
+    def present(self) -> None:
+        if self.pending:
+            now = time.perf_counter()
+            self.samples.extend(now - stamp for stamp in self.pending)
+            self.pending.clear()
+
+
+    def percentiles(self) -> dict:
+        if not self.samples:
+            return { p: 0.0 for p in PERCENTILES }
+        values = np.percentile(np.array(self.samples) * 1000, PERCENTILES)
+        return { p: float(value) for p, value in zip(PERCENTILES, values) }
+
+
+    def histogram(self) -> list:
+        """ [bucket start in ms, count], the last bucket counts everything at or above its start. """
+        milliseconds = np.minimum(np.array(self.samples) * 1000 // BUCKET, BUCKETS - 1).astype(np.int64)
+        counts       = np.bincount(milliseconds, minlength=BUCKETS)
+        return [[i * BUCKET, int(count)] for i, count in enumerate(counts)]
+
+
+    def draw(self, surface : Surface, font : Font) -> Rect:
+        """ Draws the percentiles in the top right corner, the text is re-rendered twice a second. Returns its rect. """
+        now = time.perf_counter()
+        if self.label is None or now - self.refresh > 0.5:
+            text  = "input " + "  ".join("p%d %.1f" % (p, ms) for p, ms in self.percentiles().items()) + " ms  n " + str(len(self.samples))
+            label = font.render(text, True, Color.White, Color.LightBlack)
+
+            # The box only grows, a shorter text must not leave the end of the previous one on the screen.
+            width = max(label.get_width(), self.label.get_width() if self.label else 0)
+            self.label = Surface((width, label.get_height()))
+            self.label.fill(Color.LightBlack)
+            self.label.blit(label, label.get_rect(topright=(width, 0)))
+            self.refresh = now
+
+        rect = self.label.get_rect(topright=(surface.get_width() - 4, 4))
+        surface.blit(self.label, rect)
+        return rect
+
+
+    def dump(self, path : str = None) -> None:
+        report = {
+            "samples"     : len(self.samples),
+            "percentiles" : { "p%d" % p: ms for p, ms in self.percentiles().items() },
+            "max"         : max(self.samples, default=0) * 1000,
+            "bucket_ms"   : BUCKET,
+            "histogram"   : self.histogram(),
+        }
+        with open(path or self.path, "w") as file:
+            json.dump(report, file, indent=2)
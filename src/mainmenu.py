@@ -18,6 +18,7 @@ from src.events     import EventHandler
 from src.colors     import Color
 from src.assets     import Assets
 from src.particle   import BackgroundParticleSystem
+from src.sfx        import SoundEffects
 from src.states     import GlobalStates
 
 
@@ -29,10 +30,13 @@ class MainMenuCursor(Enum):
 
 class MainMenuScreen(object):
 
-    def __init__(self, screen : Surface, assets : Assets, event_handler : EventHandler) -> None:
+    ASSETS : tuple = ("main_menu_logo_image", "main_menu_misaka_image", "select_sound", "enter_sound", "font_consolas", "font_64")
+
+    def __init__(self, screen : Surface, assets : Assets, event_handler : EventHandler, sfx : SoundEffects) -> None:
         self.screen    : Surface                  = screen
         self.assets    : Assets                   = assets
         self.events    : EventHandler             = event_handler
+        self.sfx       : SoundEffects             = sfx
 
         self.particles : BackgroundParticleSystem = BackgroundParticleSystem(100, 100)
         self.cursor    : MainMenuCursor           = MainMenuCursor.Play
@@ -51,16 +55,16 @@ class MainMenuScreen(object):
             if self.cursor == MainMenuCursor.Play:
                 return
             self.cursor = MainMenuCursor(self.cursor.value - 1)
-            self.assets.channel1.play(self.assets.select_sound)
+            self.sfx.play("select")
 
         if self.events.key("down"): 
             if self.cursor == MainMenuCursor.Quit:
                 return
             self.cursor = MainMenuCursor(self.cursor.value + 1)
-            self.assets.channel2.play(self.assets.select_sound)
+            self.sfx.play("select")
 
         if self.events.key("enter"):
-            self.assets.channel1.play(self.assets.enter_sound)
+            self.sfx.play("enter")
             if self.cursor == MainMenuCursor.Play:     GlobalStates.Screen  = "Gameplay"
             if self.cursor == MainMenuCursor.Settings: GlobalStates.Screen  = "Settings"
             if self.cursor == MainMenuCursor.Quit:     GlobalStates.Running = False
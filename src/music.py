@@ -0,0 +1,101 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/music.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import pygame
+
+from src.states     import Settings
+
+
+class MusicPlayer(object):
+    """
+    Background music streamed from disk through `pygame.mixer.music`, only a small decode buffer is ever resident.
+
+    The playlist loops. Changing tracks (`next`, `play`, a track ending) and toggling `Settings.Music` fade the
+    current track out and the next one in over `fade` seconds. The mixer streams a single track at a time, so the
+    two fades follow each other instead of overlapping.
+    """
+
+    def __init__(self, playlist : list, volume : float = 0.5, fade : float = 1.0) -> None:
+        self.playlist : list  = list(playlist)
+        self.volume   : float = volume
+        self.fade     : float = fade
+        self.index    : int   = 0
+        self.track    : int   = None    # playlist index that is loaded into the mixer
+        self.level    : float = 0       # fade envelope, 0 - 1
+
+
+    @property
+    def enabled(self) -> bool:
+        return Settings.Music and bool(self.playlist) and pygame.mixer.get_init() is not None
+
+
+    def play(self, index : int) -> None:
+        self.index = index % len(self.playlist)
+
+
+    def next(self) -> None:
+        self.play(self.index + 1)
+
+
+    def set_volume(self, volume : float) -> None:
+        self.volume = min(max(volume, 0.0), 1.0)
+
+
+    def update(self, delta : float) -> None:
+        if self.track is not None and not pygame.mixer.music.get_busy():
+            # The track ended on its own, go on with the next one from silence.
+            self.track = None
+            self.level = 0
+            self.next()
+
+        wanted = self.index if self.enabled else None
+        step   = delta / self.fade if self.fade > 0 else 1.0
+
+        if self.track != wanted and self.level > 0:
+            self.level = max(self.level - step, 0)
+        elif self.track != wanted:
+            self.load(wanted)
+        elif self.track is not None:
+            self.level = min(self.level + step, 1)
+
+        if self.track is not None:
+            pygame.mixer.music.set_volume(self.volume * self.level)
+
+
+    def load(self, index : int) -> None:
+        if self.track is not None:
+            pygame.mixer.music.stop()
+            pygame.mixer.music.unload()
+        self.track = None
+
+        if index is None:
+            return
+        try:
+            pygame.mixer.music.load(self.playlist[index])
+        except pygame.error:
+            # Unplayable file, drop it from the playlist and try the next one on the following update.
+            self.playlist.pop(index)
+            self.index = index % len(self.playlist) if self.playlist else 0
+            return
+
+        pygame.mixer.music.set_volume(0)
+        pygame.mixer.music.play()
+        self.track = index
+
+
+    def stop(self) -> None:
+        if self.track is not None:
+            pygame.mixer.music.stop()
+            pygame.mixer.music.unload()
+        self.track = None
+        self.level = 0
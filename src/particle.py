@@ -6,90 +6,301 @@
 @version    0.1
 @date       2022-04-28
 @copyright 	Copyright (c) 2022
-    
+
 Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
 ---------------------------------------------------------------------------------------------------------------------------------------
 """
 
 
 import pygame
+import numpy as np
 
-from random        import uniform, randint
 from pygame        import Surface
 from src.colors    import Color
 
-class Particle(object):
 
-    def __init__(self, position : list, velocity : list, speed : list, color : list, size : int) -> None:
-        self.position : list  = position
-        self.velocity : list  = velocity
-        self.speed    : list  = speed
-        self.color    : tuple = color
-        self.size     : int   = size
+def outline_table(side : int) -> tuple:
+    """
+    (dx, dy) pixel offsets of square outlines for every size up to `side`, one row per size of `4 * side` entries:
+    the top, bottom, left and right edge, padded with the first pixel.
+    """
+    if side not in OUTLINES:
+        k  = np.arange(side)
+        dx = np.zeros((side + 1, 4 * side), dtype=np.int32)
+        dy = np.zeros((side + 1, 4 * side), dtype=np.int32)
+        for s in range(1, side + 1):
+            edge = k[:s]
+            dx[s, :4 * s] = np.concatenate((edge, edge, np.zeros(s), np.full(s, s - 1)))
+            dy[s, :4 * s] = np.concatenate((np.zeros(s), np.full(s, s - 1), edge, edge))
+        OUTLINES[side] = (dx, dy)
+    return OUTLINES[side]
+
+
+def clipped_outlines(x : np.ndarray, y : np.ndarray, size : np.ndarray, width : int, height : int, pitch : int, slots : int) -> np.ndarray:
+    """ Pixel indices of outlines crossing the surface edge, clipped the way `pygame.draw.rect` clips them. """
+    left, right = np.maximum(x, 0), np.minimum(x + size, width)
+    top, bottom = np.maximum(y, 0), np.minimum(y + size, height)
+    w, h        = right - left, bottom - top
+    fill        = (w <= 2) | (h <= 2)
+
+    k  = np.arange(slots // 4)
+    px = np.concatenate((left[:, None] + k, left[:, None] + k, np.repeat(left[:, None], len(k), 1), np.repeat(right[:, None] - 1, len(k), 1)), 1)
+    py = np.concatenate((np.repeat(top[:, None], len(k), 1), np.repeat(bottom[:, None] - 1, len(k), 1), top[:, None] + k, top[:, None] + k), 1)
+    ok = np.concatenate(((k < w[:, None]) & (fill | (y >= 0))[:, None],
+                         (k < w[:, None]) & (fill | (y + size <= height))[:, None],
+                         (k < h[:, None]) & (fill | (x >= 0))[:, None],
+                         (k < h[:, None]) & (fill | (x + size <= width))[:, None]), 1)
+
+    # Clipping always leaves at least one edge pixel on the surface, pad with it.
+    index = py * pitch + px
+    first = index[np.arange(len(x)), ok.argmax(axis=1)]
+    return np.where(ok, index, first[:, None])
+
+
+OUTLINES : dict = {}
+
 
 class ParticleSystem(object):
-    
-    def __init__(self) -> None:
-        self.particles : list = []
-        
-    def render(self, surface : Surface) -> None:
-        for particle in self.particles:
-            pygame.draw.rect(surface, particle.color, (particle.position[0], particle.position[1], particle.size, particle.size), 1)
+    """
+    Fixed capacity pool of particles stored as parallel NumPy arrays, the live ones packed in the first `count`
+    slots. `position` moves by `velocity` every update and `velocity` by `speed` (the acceleration). Emitting into
+    a full pool drops the new particles, removing swaps the last live particles into the holes.
+
+    `renderer` picks how particles are drawn, one of `RENDERERS`. Set it on an instance, or on the class to switch
+    every system at once.
+    """
+
+    RENDERERS    : tuple = ("rect", "sprites", "pixels")
+    SPRITE_CACHE : int   = 1 << 16
+    renderer     : str   = "pixels"
+    sprites      : dict  = {}
+
+    def __init__(self, capacity : int, seed : int = None) -> None:
+        self.capacity : int                 = capacity
+        self.count    : int                 = 0
+        self.random   : np.random.Generator = np.random.default_rng(seed)
+
+        self.position : np.ndarray          = np.zeros((capacity, 2))
+        self.previous : np.ndarray          = np.zeros((capacity, 2))      # Position before the last update, for interpolation.
+        self.velocity : np.ndarray          = np.zeros((capacity, 2))
+        self.speed    : np.ndarray          = np.zeros((capacity, 2))
+        self.color    : np.ndarray          = np.zeros((capacity, 3), dtype=np.uint8)
+        self.size     : np.ndarray          = np.zeros(capacity)
+
+
+    def emit(self, position : np.ndarray, velocity : np.ndarray, speed : np.ndarray, color : np.ndarray, size : np.ndarray) -> None:
+        """ Adds `len(position)` particles, every argument is an array (or broadcastable value) of that length. """
+        count = min(len(position), self.capacity - self.count)
+        new   = slice(self.count, self.count + count)
+
+        self.position[new] = position[:count]
+        self.previous[new] = position[:count]
+        self.velocity[new] = velocity[:count] if np.ndim(velocity) == 2 else velocity
+        self.speed   [new] = speed   [:count] if np.ndim(speed)    == 2 else speed
+        self.color   [new] = color   [:count] if np.ndim(color)    == 2 else color
+        self.size    [new] = size    [:count] if np.ndim(size)     == 1 else size
+        self.count        += count
+
+
+    def remove(self, dead : np.ndarray) -> None:
+        """ Removes the live particles flagged in `dead` (a mask over the first `count` slots). """
+        alive = self.count - int(dead.sum())
+        holes = np.flatnonzero(dead[:alive])                 # Dead slots that stay inside the live range...
+        moved = alive + np.flatnonzero(~dead[alive:])        # ...are filled by live particles from past its end.
+
+        for array in (self.position, self.previous, self.velocity, self.speed, self.color, self.size):
+            array[holes] = array[moved]
+        self.count = alive
+
+
+    def clear(self) -> None:
+        self.count = 0
+
+
+    def interpolate(self, alpha : float) -> tuple:
+        live     = slice(0, self.count)
+        position = self.previous[live] + (self.position[live] - self.previous[live]) * alpha
+        return position[:, 0], position[:, 1], self.size[live]
+
+
+    def rects(self, alpha : float = 1) -> list:
+        """ Screen areas `render` will touch, for dirty rectangle updates. """
+        x, y, size = self.interpolate(alpha)
+        return [pygame.Rect(x, y, s, s) for x, y, s in zip(x.tolist(), y.tolist(), size.tolist())]
+
+
+    def render(self, surface : Surface, alpha : float = 1) -> None:
+        if self.count:
+            getattr(self, "render_" + self.renderer)(surface, alpha)
+
+
+    def render_rect(self, surface : Surface, alpha : float) -> None:
+        """ One `pygame.draw.rect` per particle. """
+        x, y, size = self.interpolate(alpha)
+        for x, y, s, color in zip(x.tolist(), y.tolist(), size.tolist(), self.color[:self.count].tolist()):
+            pygame.draw.rect(surface, color, (x, y, s, s), 1)
+
+
+    def render_sprites(self, surface : Surface, alpha : float) -> None:
+        """
+        Every (size, color) outline is rendered once into a colorkeyed sprite and the particles are submitted with
+        `blits()`. Particles crossing the surface edge still go through `pygame.draw.rect`, which has its own way
+        of clipping outlines, and the ones fully outside are skipped.
+        """
+        width, height = surface.get_size()
+        x, y, size    = self.interpolate(alpha)
+        x, y, side    = x.astype(np.int64), y.astype(np.int64), size.astype(np.int64)
+
+        visible = np.flatnonzero((x < width) & (y < height) & (x + side > 0) & (y + side > 0))
+        x, y, side = x[visible], y[visible], side[visible]
+        color      = self.color[visible].astype(np.int64)
+        keys       = (side << 24 | color[:, 0] << 16 | color[:, 1] << 8 | color[:, 2]).tolist()
+
+        cache = ParticleSystem.sprites
+        if len(cache) > self.SPRITE_CACHE:
+            cache.clear()
+        for key in set(keys).difference(cache):
+            cache[key] = self.create_sprite(key >> 24, ((key >> 16) & 0xFF, (key >> 8) & 0xFF, key & 0xFF))
+
+        batch = list(zip(map(cache.__getitem__, keys), zip(x.tolist(), y.tolist())))
+        edges = np.flatnonzero((x < 0) | (y < 0) | (x + side > width) | (y + side > height)).tolist()
+
+        # Edge particles are drawn in between the batches around them, so overlaps layer like in the other renderers.
+        start = 0
+        for i in edges:
+            surface.blits(batch[start:i], doreturn=False)
+            pygame.draw.rect(surface, self.color[visible[i]], (batch[i][1][0], batch[i][1][1], keys[i] >> 24, keys[i] >> 24), 1)
+            start = i + 1
+        surface.blits(batch[start:], doreturn=False)
+
+
+    def create_sprite(self, size : int, color : tuple) -> Surface:
+        key    = tuple(channel ^ 0xFF for channel in color)
+        sprite = Surface((size, size))
+        sprite.fill(key)
+        sprite.set_colorkey(key, pygame.RLEACCEL)
+        pygame.draw.rect(sprite, color, (0, 0, size, size), 1)
+        return sprite
+
+
+    def render_pixels(self, surface : Surface, alpha : float) -> None:
+        """
+        Writes the outline pixels of all particles into the surface's pixel buffer with one NumPy assignment.
+
+        Every particle gets a row of `4 * longest side` pixel indices, its top, bottom, left and right edge. Rows of
+        particles fully on the surface come from a per size table, the few crossing the edge are clipped like
+        `pygame.draw.rect` does: an outline cut to 2 pixels or less is filled, otherwise only its edges on the
+        surface are drawn. Unused slots repeat a pixel of the same particle, so no masking is needed, and as rows
+        are in particle order and the last write wins, overlaps resolve like in the other renderers.
+        """
+        if surface.get_bytesize() != 4:
+            return self.render_rect(surface, alpha)
+
+        width, height = surface.get_size()
+        pitch         = surface.get_pitch() // 4
+        x, y, size    = self.interpolate(alpha)
+        x, y, size    = x.astype(np.int32), y.astype(np.int32), size.astype(np.int32)
+
+        visible = np.flatnonzero((x < width) & (y < height) & (x + size > 0) & (y + size > 0))
+        if not len(visible):
+            return
+        x, y, size = x[visible], y[visible], size[visible]
+
+        dx, dy = outline_table(int(size.max()))
+        index  = (y * pitch + x)[:, None] + (dy[size] * pitch + dx[size])
+
+        edge = np.flatnonzero((x < 0) | (y < 0) | (x + size > width) | (y + size > height))
+        if len(edge):
+            index[edge] = clipped_outlines(x[edge], y[edge], size[edge], width, height, pitch, index.shape[1])
+
+        # Map RGB to the surface's pixel format in one go instead of `map_rgb` per particle.
+        color  = self.color[visible].astype(np.uint32)
+        shifts, losses = surface.get_shifts(), surface.get_losses()
+        mapped = np.uint32(surface.get_masks()[3]) | sum((color[:, i] >> losses[i]) << shifts[i] for i in range(3))
+
+        buffer = surface.get_buffer()
+        pixels = np.frombuffer(buffer, dtype=np.uint32)
+        pixels[index.ravel()] = np.repeat(mapped, index.shape[1])
+        del pixels, buffer
+
 
 class BackgroundParticleSystem(ParticleSystem):
+    """ Squares drifting up the screen, respawned below it once they leave through the top or the sides. """
 
-    def __init__(self, width : int, height : int) -> None:
-        super().__init__()
+    def __init__(self, width : int, height : int, count : int = 100, capacity : int = None, seed : int = None) -> None:
+        super().__init__(capacity or count * 2, seed)
         self.width  : int = width
         self.height : int = height
 
-        for _ in range(100):
-            self.particles.append(Particle([uniform(0, width), uniform(0, height)], [uniform(-0.5, 0.5), uniform(-0.1, -0.2)],
-                [uniform(-0.1,  0.1), uniform(-0.02, -0.09)], [randint(100, 255) for __ in range(3)], randint(2, 8)))
-    
+        self.emit(np.column_stack((self.random.uniform(0, width, count), self.random.uniform(0, height, count))),
+                  np.column_stack((self.random.uniform(-0.5, 0.5, count), self.random.uniform(-0.2, -0.1, count))),
+                  self.random_speed(count), self.random_color(count), self.random_size(count))
+
+    def random_speed(self, count : int) -> np.ndarray:
+        return np.column_stack((self.random.uniform(-0.1, 0.1, count), self.random.uniform(-0.09, -0.02, count)))
+
+    def random_color(self, count : int) -> np.ndarray:
+        return self.random.integers(100, 256, (count, 3))
+
+    def random_size(self, count : int) -> np.ndarray:
+        return self.random.integers(2, 9, count).astype(float)
+
     def distort(self) -> None:
-        for particle in self.particles:
-            particle.velocity[0] += uniform(0.1, 0.5) if particle.position[0] > self.width / 2 else uniform(-0.5, -0.1)
-            particle.velocity[1] -= uniform(0.1, 0.5)
-    
+        live  = slice(0, self.count)
+        right = self.position[live, 0] > self.width / 2
+        self.velocity[live, 0] += np.where(right, self.random.uniform(0.1, 0.5, self.count), self.random.uniform(-0.5, -0.1, self.count))
+        self.velocity[live, 1] -= self.random.uniform(0.1, 0.5, self.count)
+
     def boom(self) -> None:
-        for particle in self.particles:
-            if particle.position[1] < self.height:
-                particle.velocity[0]  += uniform(3, 5) if particle.position[0] > self.width / 2  else uniform(-5, -3)
-    
+        live    = slice(0, self.count)
+        visible = self.position[live, 1] < self.height
+        right   = self.position[live, 0] > self.width / 2
+        push    = np.where(right, self.random.uniform(3, 5, self.count), self.random.uniform(-5, -3, self.count))
+        self.velocity[live, 0] += np.where(visible, push, 0)
+
     def add(self, x : int, y : int) -> None:
-        self.particles.append(Particle([x, y], [uniform(-0.5, 0.5), uniform(-0.1, -0.2)],
-            [uniform(-0.1, 0.1), uniform(-0.02, -0.09)], [randint(100, 255) for __ in range(3)], randint(2, 8)))
+        self.emit(np.array([[x, y]], dtype=float), np.array([[self.random.uniform(-0.5, 0.5), self.random.uniform(-0.2, -0.1)]]),
+                  self.random_speed(1), self.random_color(1), self.random_size(1))
 
     def update(self, delta : float) -> None:
-        for particle in self.particles:
-            particle.position[0] += particle.velocity[0] * delta * 200
-            particle.velocity[0] += particle.speed[0]    * delta
-            particle.position[1] += particle.velocity[1] * delta * 300
-            particle.velocity[1] += particle.speed[1]    * delta
+        live = slice(0, self.count)
+        self.previous[live]  = self.position[live]
+        self.position[live] += self.velocity[live] * (delta * np.array((200, 300)))
+        self.velocity[live] += self.speed[live] * delta
+
+        x, y  = self.position[live, 0], self.position[live, 1]
+        out   = np.flatnonzero((y < 0) | (x < 0) | (x > self.width))
+        count = len(out)
+        if not count:
+            return
 
-            if  particle.position[1] < 0 or particle.position[0] < 0 or particle.position[0] > self.width:
-                particle.position = [randint(0, self.width), randint(self.height, self.height + 200)]
-                particle.velocity = [uniform(-0.5, 0.5), uniform(-0.1 , -0.5 )]
-                particle.speed    = [uniform(-0.1, 0.1), uniform(-0.02, -0.09)]
-                particle.color    = [randint(100, 255) for __ in range(3)]
-                particle.size     =  randint(2, 8)
+        self.position[out] = np.column_stack((self.random.integers(0, self.width + 1, count),
+                                              self.random.integers(self.height, self.height + 201, count)))
+        self.previous[out] = self.position[out]
+        self.velocity[out] = np.column_stack((self.random.uniform(-0.5, 0.5, count), self.random.uniform(-0.5, -0.1, count)))
+        self.speed   [out] = self.random_speed(count)
+        self.color   [out] = self.random_color(count)
+        self.size    [out] = self.random_size(count)
 
 
 class HardDropParticleSystem(ParticleSystem):
+    """ Grey squares shooting up from a hard dropped peace and shrinking until they vanish. """
 
-    def __init__(self) -> None:
-        super().__init__()
+    def __init__(self, capacity : int = 1024, seed : int = None) -> None:
+        super().__init__(capacity, seed)
 
     def add(self, x : int, y : int, offset_x : int, offset_y : int) -> None:
-        self.particles.append(Particle([randint(x, offset_x), randint(y, offset_y)], [uniform(-0.01, 0.01), uniform(-1, -1)],
-            [uniform(-0.1,  0.1),  uniform(-0.02, -0.09)], Color.Grey, 10))
+        self.emit(np.array([[self.random.integers(x, offset_x + 1), self.random.integers(y, offset_y + 1)]], dtype=float),
+                  np.array([[self.random.uniform(-0.01, 0.01), -1]]),
+                  np.array([[self.random.uniform(-0.1, 0.1), self.random.uniform(-0.09, -0.02)]]), Color.Grey, 10)
 
     def update(self, delta : float) -> None:
-        for particle in self.particles:
-            particle.position[1] += particle.velocity[1] * delta * 200
-            particle.velocity[1] += particle.speed[1]    * delta * 400
+        live = slice(0, self.count)
+        self.previous[live]     = self.position[live]
+        self.position[live, 1] += self.velocity[live, 1] * delta * 200
+        self.velocity[live, 1] += self.speed[live, 1]    * delta * 400
+        self.size[live]        -= delta * 15
 
-            particle.size -= delta * 15 
-            if  particle.size < 1:
-                self.particles.remove(particle) 
\ No newline at end of file
+        dead = self.size[live] < 1
+        if dead.any():
+            self.remove(dead)
@@ -1,3 +1,8 @@
+from typing        import NamedTuple
+
+from src.constants import Constants
+
+
 TETRIS_PEACES : dict = {
     "T": [ [[ 0, 1, 0 ], [ 1, 1, 1 ]], [[ 0, 1, 0 ], [ 0, 1, 1 ], [ 0, 1, 0 ]] , [[0, 0, 0], [ 1, 1, 1 ], [ 0, 1, 0 ]], [[ 0, 1 ], [ 1, 1 ], [ 0, 1 ]]  ],
     "L": [ [[ 0, 0, 0 ], [ 1, 1, 1 ], [ 1, 0, 0 ]], [[ 1, 1 ], [ 0, 1 ], [ 0, 1 ]], [[ 0, 0, 1 ], [ 1, 1, 1 ]], [[ 0, 1, 0 ], [ 0, 1, 0 ], [ 0, 1, 1 ]] ],
@@ -6,4 +11,41 @@ TETRIS_PEACES : dict = {
     "I": [ [[0, 0, 0, 0],[ 1, 1, 1, 1 ]], [[0, 1 ], [0, 1 ], [ 0,1 ], [ 0,1 ]], [[0, 0, 0, 0],[ 1, 1, 1, 1 ]], [[0, 1 ], [0, 1 ], [ 0,1 ], [0, 1 ]] ],
     "S": [ [ [0, 0, 0],[ 0, 1, 1 ], [ 1, 1, 0 ]], [[ 0, 1, 0 ], [ 0, 1, 1 ], [ 0, 0, 1 ]], [[0, 0, 0],[ 0, 1, 1 ], [ 1, 1, 0 ]], [[ 0, 1, 0 ], [ 0,1, 1 ], [0, 0, 1 ]] ],
     "Z": [ [[0, 0, 0],[ 1, 1, 0 ], [ 0, 1, 1 ]], [[ 0, 0, 1 ], [ 0, 1, 1 ], [ 0, 1, 0 ]], [[0, 0, 0],[ 1, 1, 0 ], [ 0, 1, 1 ]], [[ 0, 0, 1 ], [ 0, 1, 1 ], [ 0, 1, 0 ]] ]
-}
\ No newline at end of file
+}
+
+
+class PeaceShape(NamedTuple):
+    """ Precompiled form of one peace rotation. Built once at import, shared by every system and renderer. """
+    name     : str     # Key in `TETRIS_PEACES`.
+    rotation : int     # Index of the rotation in `TETRIS_PEACES[name]`.
+    width    : int     # Width of the rotation matrix (empty columns included).
+    height   : int     # Height of the rotation matrix (empty rows included).
+    cells    : tuple   # Occupied (x, y) offsets from the top left corner, row by row.
+    masks    : tuple   # Bitmask of every matrix row, bit `j` set means column `j` is occupied.
+    box      : tuple   # Bounding box of the occupied cells as (left, top, right, bottom), inclusive.
+    lefts    : tuple   # Leftmost occupied column of every row, -1 for empty rows.
+    rights   : tuple   # Rightmost occupied column of every row, -1 for empty rows.
+    bottoms  : tuple   # Lowest occupied row of every column, -1 for empty columns.
+    shifted  : dict    # Cursor x -> ((y, mask), ...) with the masks already moved to that column, only for x inside the board.
+
+
+def compile_peace(name : str, rotation : int, peace : list, cols : int) -> PeaceShape:
+    cells   = tuple((j, i) for i in range(len(peace)) for j in range(len(peace[i])) if peace[i][j])
+    masks   = tuple(sum(1 << j for j, cell in enumerate(row) if cell) for row in peace)
+    lefts   = tuple((mask & -mask).bit_length() - 1 if mask else -1 for mask in masks)
+    rights  = tuple(mask.bit_length() - 1 if mask else -1 for mask in masks)
+    bottoms = tuple(max((y for x, y in cells if x == j), default=-1) for j in range(len(peace[0])))
+    box     = (min(x for x, _ in cells), min(y for _, y in cells), max(x for x, _ in cells), max(y for _, y in cells))
+
+    rows    = tuple((i, mask) for i, mask in enumerate(masks) if mask)
+    shifted = {}
+    for x in range(-box[0], cols - box[2]):
+        shifted[x] = tuple((i, mask << x if x >= 0 else mask >> -x) for i, mask in rows)
+
+    return PeaceShape(name, rotation, len(peace[0]), len(peace), cells, masks, box, lefts, rights, bottoms, shifted)
+
+
+PEACE_NAMES  : tuple = tuple(TETRIS_PEACES.keys())
+PEACE_SHAPES : dict  = {
+    name: tuple(compile_peace(name, rotation, peace, Constants.COLS) for rotation, peace in enumerate(rotations)) for name, rotations in TETRIS_PEACES.items()
+}
@@ -0,0 +1,154 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/placements.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+
+Every final placement the current peace can reach, for bots, hint overlays and analytics.
+
+    for placement in find_placements(system):
+        placement.rotation, placement.x, placement.y, placement.path
+"""
+
+from collections    import deque
+from typing         import NamedTuple
+
+from src.actions    import Action
+from src.bitboard   import Bitboard
+from src.constants  import Constants
+from src.peaces     import PEACE_SHAPES
+from src.systems    import GameplaySystem
+
+MOVES : tuple = (Action.Left, Action.Right, Action.RotateCW, Action.RotateCCW)
+
+
+class Placement(NamedTuple):
+    rotation : int
+    x        : int      # Cursor the peace is placed at, as passed to `Bitboard.place`.
+    y        : int
+    path     : tuple    # Actions leading there from the starting state, ending with the one that locks.
+
+
+def compile_moves(shapes : tuple, cols : int) -> dict:
+    """
+    (rotation, x) -> ((action, rotation, x, shape, turn), ...) for the left, right and rotate actions that keep
+    the peace inside the walls, with the column clamping of `GameplaySystem.rotate_peace` already applied. Only
+    the board and the height checks are left to do while searching, `turn` says the height check applies.
+    """
+    table = {}
+    for rotation, shape in enumerate(shapes):
+        for x in shape.shifted:
+            moves = []
+            for action in MOVES:
+                if action == Action.Left or action == Action.Right:
+                    new, nx, turn = rotation, x + (-1 if action == Action.Left else 1), False
+                else:
+                    new, nx, turn = (rotation + (1 if action == Action.RotateCW else -1)) % 4, x, True
+                    if   nx < 0:                            nx = 0
+                    elif nx + shapes[new].width > cols:     nx = cols - shapes[new].width
+
+                if nx in shapes[new].shifted:
+                    moves.append((action, new, nx, shapes[new], turn))
+            table[rotation, x] = tuple(moves)
+    return table
+
+
+MOVE_TABLES : dict = { name: compile_moves(shapes, Constants.COLS) for name, shapes in PEACE_SHAPES.items() }
+
+
+def enumerate_placements(board : Bitboard, peace : str, rotation : int, x : int, y : int) -> list:
+    """
+    Breadth first search over (rotation, x, y) from the given state. Every distinct set of cells the peace can lock
+    into is returned once, with the first path found to it.
+
+    Rows where no rotation of the peace can touch a block are searched only at the starting row. Moves there do
+    not depend on the board or the height, so every (rotation, x) reachable at the start is reachable down to the
+    last such row, and the search goes on from there. A sideways tuck or spin is therefore only looked for where
+    it can change anything, near the stack.
+
+    Paths hold no gravity, it only ever adds soft drops, and only the actions needed before the locking one.
+    """
+    shapes  = PEACE_SHAPES[peace]
+    table   = MOVE_TABLES[peace]
+    rows    = board.rows
+    start   = (rotation, x, y)
+    parents = { start: None }       # State -> (previous state, actions from there).
+    locked  = set()                 # (rotation, x, y) already locked, skips rebuilding their cells.
+    found   = {}                    # Locked cells -> Placement.
+
+    def path(state : tuple) -> list:
+        actions = []
+        while parents[state]:
+            state, step = parents[state]
+            actions[:0] = step
+        return actions
+
+    def lock(state : tuple, rotation : int, x : int, y : int, action : Action) -> None:
+        if (rotation, x, y) in locked:
+            return
+        locked.add((rotation, x, y))
+
+        key = tuple((y + i, mask) for i, mask in shapes[rotation].shifted[x])
+        if key in found:
+            return
+
+        actions = path(state)
+        if action == Action.HardDrop:
+            # Soft drops right before a hard drop land the peace in the same place.
+            while actions and actions[-1] == Action.SoftDrop:
+                actions.pop()
+        found[key] = Placement(rotation, x, y, tuple(actions) + (action,))
+
+    def expand(state : tuple, queue : deque) -> None:
+        y = state[2]
+        for action, rotation, x, shape, turn in table[state[0], state[1]]:
+            new = (rotation, x, y)
+            if new in parents or (turn and y + shape.height > rows) or board.collides(shape, x, y):
+                continue
+            parents[new] = (state, (action,))
+            queue.append(new)
+
+    # Left, right and rotations on the starting row.
+    queue = deque([start])
+    while queue:
+        expand(queue.popleft(), queue)
+
+    free = min(board.tops) - max(shape.height for shape in shapes)
+    if y < free:
+        queue = deque()
+        for state in list(parents):
+            low          = (state[0], state[1], free)
+            parents[low] = (state, (Action.SoftDrop,) * (free - y))
+            queue.append(low)
+    else:
+        queue = deque(parents)
+
+    while queue:
+        state          = queue.popleft()
+        rotation, x, y = state
+        shape          = shapes[rotation]
+
+        lock(state, rotation, x, y + board.drop_distance(shape, x, y), Action.HardDrop)
+
+        if board.collides(shape, x, y + 1) or y + 1 + shape.height > rows:
+            lock(state, rotation, x, y, Action.SoftDrop)
+        elif (rotation, x, y + 1) not in parents:
+            new          = (rotation, x, y + 1)
+            parents[new] = (state, (Action.SoftDrop,))
+            queue.append(new)
+
+        expand(state, queue)
+
+    return list(found.values())
+
+
+def find_placements(system : GameplaySystem) -> list:
+    """ `enumerate_placements` for the current peace of a system, from where it is now. """
+    return enumerate_placements(system.board, system.current_peace, system.rotation,
+                                system.cursor[Constants.X], system.cursor[Constants.Y])
@@ -0,0 +1,131 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/policies.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import random
+import importlib
+
+from src.actions   import Action
+from src.constants import Constants
+from src.peaces    import PEACE_SHAPES
+from src.systems   import GameplaySystem
+
+
+class Policy(object):
+    """ Decides the action of every tick for a headless `GameplaySystem`. One instance plays one game. """
+
+    def __init__(self, seed : int = None) -> None:
+        self.random : random.Random = random.Random(seed)
+
+    def act(self, system : GameplaySystem) -> Action:
+        return Action.Nothing
+
+
+class RandomPolicy(Policy):
+
+    ACTIONS : list = list(Action)
+
+    def act(self, system : GameplaySystem) -> Action:
+        return self.random.choice(self.ACTIONS)
+
+
+class GreedyPolicy(Policy):
+    """
+    Looks at every rotation and column the current peace can be hard dropped into, scores the resulting board
+    and walks the peace to the best one. The weights are the usual aggregate height / lines / holes / bumpiness
+    mix, good enough to survive for a long time and to give stable numbers when comparing rule changes.
+    """
+
+    WEIGHTS : tuple = (-0.51, 0.76, -0.36, -0.18)
+
+    def __init__(self, seed : int = None) -> None:
+        super().__init__(seed)
+        self.target : tuple = None
+        self.last   : tuple = None
+
+
+    def act(self, system : GameplaySystem) -> Action:
+        state = (system.current_peace, system.rotation, system.cursor[Constants.X], system.cursor[Constants.Y], system.board.version)
+        if state == self.last:
+            # The last move was blocked, drop where we are.
+            self.target, self.last = None, None
+            return Action.HardDrop
+
+        if self.target is None or self.target[0] != system.board.version:
+            self.target = self.plan(system)
+            if self.target is None:
+                return Action.HardDrop
+
+        self.last = state
+        _, rotation, x = self.target
+
+        if system.rotation != rotation:        return Action.RotateCW
+        if system.cursor[Constants.X] < x:     return Action.Right
+        if system.cursor[Constants.X] > x:     return Action.Left
+
+        self.target, self.last = None, None
+        return Action.HardDrop
+
+
+    def plan(self, system : GameplaySystem) -> tuple:
+        board = system.board
+        y     = system.cursor[Constants.Y]
+        best  = None
+
+        for rotation, shape in enumerate(PEACE_SHAPES[system.current_peace]):
+            for x in shape.shifted:
+                distance = board.drop_distance(shape, x, y)
+                if distance < 0:
+                    continue
+
+                score = self.evaluate(board.masks, board.full, shape.shifted[x], y + distance)
+                if best is None or score > best[0]:
+                    best = (score, rotation, x)
+
+        return None if best is None else (board.version, best[1], best[2])
+
+
+    def evaluate(self, masks : list, full : int, rows : tuple, y : int) -> float:
+        masks = list(masks)
+        for i, mask in rows:
+            masks[y + i] |= mask
+
+        kept  = [mask for mask in masks if mask != full]
+        lines = len(masks) - len(kept)
+        masks = [0] * lines + kept
+
+        heights = [0] * Constants.COLS
+        holes   = 0
+        covered = 0
+        for i, mask in enumerate(masks):
+            holes += bin(covered & ~mask).count("1")
+            new    = mask & ~covered
+            for j in range(Constants.COLS):
+                if new >> j & 1:
+                    heights[j] = len(masks) - i
+            covered |= mask
+
+        bumpiness = sum(abs(heights[j] - heights[j + 1]) for j in range(Constants.COLS - 1))
+        weights   = self.WEIGHTS
+        return weights[0] * sum(heights) + weights[1] * lines + weights[2] * holes + weights[3] * bumpiness
+
+
+POLICIES : dict = { "idle": Policy, "random": RandomPolicy, "greedy": GreedyPolicy }
+
+
+def load_policy(name : str):
+    """ Returns a policy class, either a name from `POLICIES` or a `package.module:Class` path. """
+    if name in POLICIES:
+        return POLICIES[name]
+
+    module, _, attribute = name.partition(":")
+    return getattr(importlib.import_module(module), attribute)
@@ -0,0 +1,138 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/profiler.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import csv
+import time
+import numpy as np
+import pygame
+
+from pygame         import Surface, Rect
+from pygame.font    import Font
+from src.colors     import Color
+
+BAR_WIDTH = 150      # pixels for `BAR_SCALE` milliseconds
+LABELS    = 180      # pixels left of the bars
+BAR_SCALE = 8.0
+
+
+class FrameProfiler(object):
+    """
+    Per stage timings of the last `capacity` frames. Stages are methods replaced on their instance by `wrap`, so
+    nothing is timed (or even wrapped) unless a profiler exists. Times are exclusive: a stage called from another
+    one is subtracted from its caller, the stages of a frame add up to the time spent in them. Whatever the frame
+    spent outside every stage (mostly waiting in `Clock.tick`) is the `idle` column.
+    """
+
+    def __init__(self, capacity : int = 600, path : str = None) -> None:
+        self.capacity : int        = capacity
+        self.path     : str        = path
+        self.labels   : list       = ["idle"]
+        self.current  : list       = [0.0]
+        self.stack    : list       = []
+        self.ring     : np.ndarray = np.zeros((capacity, 1))
+        self.frames   : int        = 0
+        self.start    : float      = None
+        self.visible  : bool       = True
+        self.panel    : Surface    = None
+        self.refresh  : float      = 0
+
+
+    def wrap(self, owner, name : str, label : str = None) -> None:
+        """ Times every call of `owner.name` under `label` (default the method name). """
+        method = getattr(owner, name)
+        label  = label or name
+        if label not in self.labels:
+            self.labels.append(label)
+            self.current.append(0.0)
+        index  = self.labels.index(label)
+        stack  = self.stack
+        clock  = time.perf_counter
+
+        def timed(*args, **kwargs):
+            stack.append(0.0)
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed  = clock() - start
+                children = stack.pop()
+                self.current[index] += elapsed - children
+                if stack:
+                    stack[-1] += elapsed
+
+        setattr(owner, name, timed)
+
+
+    def frame(self) -> None:
+        """ Closes the running frame into the ring buffer and starts the next one. """
+        now = time.perf_counter()
+        if self.start is not None:
+            self.current[0] = max(now - self.start - sum(self.current[1:]), 0)
+
+            if self.ring.shape[1] != len(self.labels):
+                ring = np.zeros((self.capacity, len(self.labels)))
+                ring[:, :self.ring.shape[1]] = self.ring
+                self.ring = ring
+
+            self.ring[self.frames % self.capacity] = self.current
+            self.frames += 1
+
+        self.current = [0.0] * len(self.labels)
+        self.start   = now
+
+
+    def history(self) -> np.ndarray:
+        """ Recorded frames oldest first, one column per label, in seconds. """
+        if self.frames <= self.capacity:
+            return self.ring[:self.frames]
+        return np.roll(self.ring, -(self.frames % self.capacity), axis=0)
+
+
+    def draw(self, surface : Surface, font : Font) -> Rect:
+        """ Bar graph of the mean stage times in the bottom left corner, rebuilt four times a second. Returns its rect. """
+        now = time.perf_counter()
+        if self.panel is None or now - self.refresh > 0.25:
+            self.panel   = self.render_panel(font)
+            self.refresh = now
+
+        rect = self.panel.get_rect(bottomleft=(4, surface.get_height() - 4))
+        surface.blit(self.panel, rect)
+        return rect
+
+
+    def render_panel(self, font : Font) -> Surface:
+        history = self.history()
+        means   = history.mean(axis=0) * 1000 if len(history) else np.zeros(len(self.labels))
+        rows    = [(label, ms) for label, ms in zip(self.labels, means) if label != "idle"]
+        rows.append(("idle", means[0]))
+
+        height  = font.get_linesize()
+        panel   = Surface((LABELS + BAR_WIDTH + 56, height * len(rows) + 4))
+        panel.fill(Color.LightBlack)
+
+        for i, (label, ms) in enumerate(rows):
+            y = 2 + i * height
+            pygame.draw.rect(panel, Color.LogoRed if label != "idle" else Color.Grey, (LABELS, y + 2, min(ms / BAR_SCALE, 1) * BAR_WIDTH, height - 4))
+            panel.blit(font.render(label, True, Color.White), (4, y))
+            panel.blit(font.render("%.2f" % ms, True, Color.White), (LABELS + BAR_WIDTH + 8, y))
+        return panel
+
+
+    def dump(self, path : str = None) -> None:
+        """ Writes the frames still in the ring buffer (the last `capacity`) as CSV rows of milliseconds. """
+        with open(path or self.path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["frame"] + self.labels)
+            first = max(self.frames - self.capacity, 0)
+            for i, row in enumerate(self.history()):
+                writer.writerow([first + i] + ["%.4f" % (value * 1000) for value in row])
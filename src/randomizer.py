@@ -0,0 +1,109 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/randomizer.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import abc
+import random
+
+from collections import deque
+
+from src.peaces  import PEACE_NAMES
+
+
+class PeaceGenerator(abc.ABC):
+    """ Produces peace names in blocks of `BLOCK`. Subclasses decide the distribution, the RNG is owned by `PeaceSource`. """
+
+    BLOCK : int = len(PEACE_NAMES)
+
+    def __init__(self, rng : random.Random) -> None:
+        self.random : random.Random = rng
+
+    @abc.abstractmethod
+    def generate(self) -> list:
+        """ The next block of peace names. """
+
+
+class UniformGenerator(PeaceGenerator):
+    """ Every peace is an independent uniform pick, like the original `random.choice`. """
+
+    def generate(self) -> list:
+        return self.random.choices(PEACE_NAMES, k=self.BLOCK)
+
+
+class BagGenerator(PeaceGenerator):
+    """ 7-bag: every block is a shuffled copy of all seven peaces. """
+
+    def generate(self) -> list:
+        bag = list(PEACE_NAMES)
+        self.random.shuffle(bag)
+        return bag
+
+
+class HistoryGenerator(PeaceGenerator):
+    """ Rerolls a pick up to `TRIES` times while it is one of the last `len(history)` peaces. """
+
+    TRIES : int = 6
+
+    def __init__(self, rng : random.Random) -> None:
+        super().__init__(rng)
+        self.history : deque = deque(("Z", "S", "Z", "S"), maxlen=4)
+
+    def generate(self) -> list:
+        block = []
+        for _ in range(self.BLOCK):
+            for _ in range(self.TRIES):
+                peace = self.random.choice(PEACE_NAMES)
+                if peace not in self.history:
+                    break
+            self.history.append(peace)
+            block.append(peace)
+        return block
+
+
+GENERATORS : dict = { "uniform": UniformGenerator, "bag": BagGenerator, "history": HistoryGenerator }
+
+
+class PeaceSource(object):
+    """
+    Seeded supply of peaces with a preview queue at least `preview` deep. The queue is refilled a whole generator
+    block at a time, so taking a peace is just a `popleft()`.
+    """
+
+    def __init__(self, seed : int = None, generator : str = "uniform", preview : int = 5) -> None:
+        self.random    : random.Random  = random.Random(seed)
+        self.name      : str            = generator
+        self.generator : PeaceGenerator = GENERATORS[generator](self.random)
+        self.depth     : int            = preview
+        self.queue     : deque          = deque()
+
+        self.fill()
+
+
+    def fill(self) -> None:
+        while len(self.queue) <= self.depth:
+            self.queue.extend(self.generator.generate())
+
+
+    def next(self) -> str:
+        peace = self.queue.popleft()
+        if len(self.queue) <= self.depth:
+            self.fill()
+        return peace
+
+
+    def peek(self, index : int = 0) -> str:
+        return self.queue[index]
+
+
+    def preview(self, count : int = None) -> list:
+        count = self.depth if count is None else min(count, len(self.queue))
+        return [self.queue[i] for i in range(count)]
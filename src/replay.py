@@ -0,0 +1,236 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/replay.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+
+Session recording as seed + input log.
+
+File layout (all integers are unsigned LEB128 varints unless noted):
+
+    b"MTRP" | version (u8) | seed | generator name length (u8) | generator name (ascii) | records...
+
+Every record starts with the number of ticks since the previous record, followed by a code byte. Codes below
+`DELTA` are `Action` values applied before the next tick. `DELTA` is followed by a little endian float64 and sets
+the delta of the ticks that follow, it is only written when the delta changes. `END` is followed by the final
+score, lines, level, tick count of the running game and a little endian u32 CRC of the board, which playback checks against.
+A file cut short before `END` plays up to where its data ends and is reported unverified.
+
+Only ticks the system actually ran are counted (not the paused ones), so a recording made through
+`GameplayScreen` replays headlessly at full speed.
+
+    python -m src.replay session.mtr
+"""
+
+import sys
+import time
+import zlib
+import struct
+
+from src.actions   import Action
+from src.systems   import GameplaySystem
+
+
+MAGIC   : bytes = b"MTRP"
+VERSION : int   = 1
+DELTA   : int   = 0xFE
+END     : int   = 0xFF
+
+
+def write_varint(out, value : int) -> None:
+    while True:
+        byte   = value & 0x7F
+        value >>= 7
+        if value:
+            out.write(bytes((byte | 0x80,)))
+        else:
+            out.write(bytes((byte,)))
+            return
+
+
+def read_varint(data : bytes, position : int) -> tuple:
+    value, shift = 0, 0
+    while True:
+        byte      = data[position]
+        position += 1
+        value    |= (byte & 0x7F) << shift
+        shift    += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def board_crc(system : GameplaySystem) -> int:
+    crc = zlib.crc32(b"".join(mask.to_bytes(2, "little") for mask in system.board.masks))
+    for row in system.board.colors:
+        crc = zlib.crc32(row, crc)
+    return crc
+
+
+class ReplayWriter(object):
+    """ Streams a session to disk while it is played. Attach with `system.recorder = writer`. """
+
+    def __init__(self, path : str, seed : int, generator : str = "uniform") -> None:
+        self.file  = open(path, "wb")
+        self.ticks : int   = 0
+        self.last  : int   = 0
+        self.delta : float = None
+
+        self.file.write(MAGIC + bytes((VERSION,)))
+        write_varint(self.file, seed)
+        self.file.write(bytes((len(generator),)) + generator.encode("ascii"))
+
+
+    def record(self, code : int) -> None:
+        write_varint(self.file, self.ticks - self.last)
+        self.file.write(bytes((code,)))
+        self.last = self.ticks
+
+
+    def action(self, action : Action) -> None:
+        self.record(action.value)
+
+
+    def tick(self, delta : float) -> None:
+        if delta != self.delta:
+            self.record(DELTA)
+            self.file.write(struct.pack("<d", delta))
+            self.delta = delta
+        self.ticks += 1
+
+
+    def close(self, system : GameplaySystem) -> None:
+        self.record(END)
+        for value in (system.score, system.cleared_lines, system.level, system.ticks):
+            write_varint(self.file, value)
+        self.file.write(struct.pack("<I", board_crc(system)))
+        self.file.close()
+
+
+class ReplayPlayer(object):
+    """
+    Re-drives a `GameplaySystem` from a recording, either all at once (`play`) or tick by tick in real time
+    (`advance`, called every frame by `GameplayScreen`).
+    """
+
+    def __init__(self, path : str) -> None:
+        with open(path, "rb") as file:
+            self.data : bytes = file.read()
+
+        if self.data[:4] != MAGIC or self.data[4:5] != bytes((VERSION,)):
+            raise ValueError("{} is not a version {} Misaka Tetris replay".format(path, VERSION))
+
+        try:
+            self.seed, position = read_varint(self.data, 5)
+            length              = self.data[position]
+        except IndexError:
+            length, position    = 0, len(self.data)
+        self.generator      = self.data[position + 1: position + 1 + length].decode("ascii")
+        self.position : int = position + 1 + length
+        if self.position > len(self.data):
+            raise ValueError("{} ends inside its header".format(path))
+
+        self.gap      : int   = 0         # Ticks left to run before the pending record applies.
+        self.code     : int   = None
+        self.delta    : float = 0
+        self.clock    : float = 0
+        self.done     : bool  = False
+        self.expected : tuple = None
+
+        self.read_record()
+
+
+    def create_system(self, **kwargs) -> GameplaySystem:
+        return GameplaySystem(seed=self.seed, generator=self.generator, **kwargs)
+
+
+    def read_record(self) -> None:
+        try:
+            self.gap, self.position = read_varint(self.data, self.position)
+            self.code               = self.data[self.position]
+            self.position          += 1
+        except IndexError:
+            self.truncate()
+
+
+    def truncate(self) -> None:
+        """ The data ends without an `END` footer (the session crashed), playback stops there and stays unverified. """
+        self.gap, self.code, self.done = 0, None, True
+
+
+    @property
+    def truncated(self) -> bool:
+        return self.done and self.expected is None
+
+
+    def apply_records(self, system : GameplaySystem) -> None:
+        """ Applies every record due before the next tick. """
+        while self.gap == 0 and not self.done:
+            try:
+                if self.code == DELTA:
+                    self.delta     = struct.unpack_from("<d", self.data, self.position)[0]
+                    self.position += 8
+                elif self.code == END:
+                    values = []
+                    for _ in range(4):
+                        value, self.position = read_varint(self.data, self.position)
+                        values.append(value)
+                    values.append(struct.unpack_from("<I", self.data, self.position)[0])
+                    self.expected = tuple(values)
+                    self.done     = True
+                    return
+                else:
+                    system.step(Action(self.code))
+            except (IndexError, struct.error):
+                self.truncate()
+                return
+
+            self.read_record()
+
+
+    def play_tick(self, system : GameplaySystem) -> None:
+        if not system.is_running():
+            return
+
+        self.apply_records(system)
+        if self.done:
+            return
+
+        system.tick(self.delta)
+        self.gap -= 1
+
+
+    def advance(self, system : GameplaySystem, delta : float) -> None:
+        """ Real time playback: runs as many recorded ticks as fit in `delta` seconds. """
+        self.clock += delta
+        while not self.done and system.is_running() and self.clock >= self.delta:
+            self.clock -= self.delta
+            self.play_tick(system)
+
+
+    def play(self, system : GameplaySystem) -> None:
+        while not self.done and system.is_running():
+            self.play_tick(system)
+
+
+    def verify(self, system : GameplaySystem) -> bool:
+        return self.done and self.expected == (system.score, system.cleared_lines, system.level, system.ticks, board_crc(system))
+
+
+if __name__ == "__main__":
+    player = ReplayPlayer(sys.argv[1])
+    system = player.create_system()
+
+    start = time.perf_counter()
+    player.play(system)
+    elapsed = time.perf_counter() - start
+
+    status = "OK" if player.verify(system) else "UNVERIFIED (no footer)" if player.truncated else "MISMATCH"
+    print("score {} lines {} level {} ticks {} in {:.3f}s: {}".format(
+        system.score, system.cleared_lines, system.level, system.ticks, elapsed, status))
+    sys.exit(0 if player.verify(system) else 2 if player.truncated else 1)
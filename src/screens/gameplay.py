@@ -20,185 +20,335 @@ from datetime       import date
 from src.events     import EventHandler
 from src.assets     import Assets
 from src.systems    import GameplaySystem
+from src.controls   import KeyboardController
+from src.bus        import GameEvent
+from src.replay     import ReplayPlayer
+from src.sfx        import SoundEffects
+from src.latency    import LatencyMonitor
+from src.profiler   import FrameProfiler
+from src.animation  import Timeline, Tween, pulse
+from src.peaces     import PeaceShape
 from src.constants  import Constants
 from src.colors     import Color
+from src.atlas      import BlockAtlas
 from src.particle   import BackgroundParticleSystem, HardDropParticleSystem
 from src.states     import GlobalStates
 
-from src.screens.screen import Screen
+from src.screens.screen import Screen, merge_rects
 
-BSIZE = 32
+BSIZE        = 32
+FIELD_OFFSET = 13
+PAUSE_RECT   = pygame.Rect(8 * BSIZE, 250, 10 * 32, 200)
+CLEAR_TIME   = 0.4       # seconds to wipe the cleared rows, left to right
+SHAKE        = 4         # pixels the board dips on a hard drop
+SHAKE_TIME   = 0.25
 
 class GameplayScreen(Screen):
 
-    def __init__(self, surface: Surface, assets: Assets, event_handler: EventHandler) -> None:
+    ASSETS : tuple = ("logo_image", "blocks", "font_32", "font_48", "drop_sound", "clear_sound")
+
+    def __init__(self, surface: Surface, assets: Assets, event_handler: EventHandler, sfx: SoundEffects, seed: int = None, player: ReplayPlayer = None) -> None:
         self.surface   : Surface = surface
         self.assets    : Assets  = assets
+        self.sfx       : SoundEffects = sfx
+        self.latency   : LatencyMonitor = None
         self.events    : EventHandler = event_handler
-        self.system    : GameplaySystem = GameplaySystem(event_handler, self.assets)
-        self.particles : BackgroundParticleSystem = BackgroundParticleSystem(Constants.SCREEN_SIZE[0], Constants.SCREEN_SIZE[1])
-        self.hard_drop_particles : HardDropParticleSystem = HardDropParticleSystem()
-
-        self.new_block_remove_timer : float = 0
-        self.block_in_row_to_remove : int   = 0
-
-
-        self.board_offset_y : float = 0
-        self.vel : float = 0
+        self.player    : ReplayPlayer = player
+        self.system    : GameplaySystem = player.create_system() if player else GameplaySystem(seed=seed)
+        self.controller: KeyboardController = KeyboardController(event_handler)
+        self.blocks    : BlockAtlas = assets.blocks.scaled(BSIZE)
+        self.particles : BackgroundParticleSystem = BackgroundParticleSystem(Constants.SCREEN_SIZE[0], Constants.SCREEN_SIZE[1], Constants.PARTICLES, seed=seed)
+        self.hard_drop_particles : HardDropParticleSystem = HardDropParticleSystem(seed=seed)
+
+        # Effects play on `timeline` over what the screen saw, the system never waits for them. `cleared` is a
+        # snapshot of the board colors and the full rows taken when a clear happens, drawn until its wipe ends.
+        self.timeline  : Timeline = Timeline()
+        self.cleared   : tuple    = None
+        self.clears    : int      = 0
+        self.board_offset_y : int      = 0
+
+        # Layers: `chrome` never changes, `field` holds the locked blocks and `hud` the previews and counters, each
+        # re-rendered only when what it shows changes. `overlay` is all three composed, the part of the frame that
+        # sits above the background particles.
+        self.chrome    : Surface = Surface(Constants.SCREEN_SIZE, pygame.SRCALPHA)
+        self.field     : Surface = Surface((Constants.COLS * BSIZE, Constants.ROWS * BSIZE), pygame.SRCALPHA)
+        self.overlay   : Surface = Surface(Constants.SCREEN_SIZE, pygame.SRCALPHA)
+        self.field_key : tuple   = None
+        self.field_pos : tuple   = (FIELD_OFFSET * BSIZE, 0)
+        self.hud       : dict    = {}
+        self.chrome_rects : list = []
+        self.dirty     : list    = []
+        self.previous  : list    = []
+
+        self.draw_chrome()
+        self.invalidate()
+
+        self.system.bus.subscribe(GameEvent.HardDrop, self.on_hard_drop)
+        self.system.bus.subscribe(GameEvent.Lock,     self.on_lock)
+        self.system.bus.subscribe(GameEvent.Clear,    self.on_clear)
+        self.sfx.bind(self.system.bus, GameEvent.Lock,  "drop")
+        self.sfx.bind(self.system.bus, GameEvent.Clear, "clear")
+
+    def on_hard_drop(self, peace: str, cursor: list) -> None:
+        self.particles.distort()
+        self.timeline.play("shake", Tween(0, SHAKE, SHAKE_TIME, pulse))
+
+        # Emitted before the lock, the system still holds the dropped rotation.
+        x, y  = (cursor[Constants.X] + FIELD_OFFSET) * BSIZE, cursor[Constants.Y] * BSIZE
+        width = self.system.get_current_peace().width * BSIZE
+        for _ in range(10):
+            self.hard_drop_particles.add(x, y, x + width, y + BSIZE)
+
+    def on_lock(self, **event) -> None:
+        # The snapshot no longer shows the board, cut the wipe short rather than hide the locked peace.
+        self.timeline.finish("clear")
+
+    def on_clear(self, rows: list, **event) -> None:
+        tetris       = len(rows) == 4
+        self.cleared = ([bytearray(row) for row in self.system.board.colors], set(rows))
+        self.clears += 1
+        self.timeline.play("clear", Tween(0, Constants.COLS, CLEAR_TIME, done=lambda: self.end_clear(tetris)))
+
+    def end_clear(self, tetris: bool) -> None:
+        self.cleared = None
+        if tetris:
+            self.particles.boom()
 
 
     def get_image_for_block(self, peace: int) -> Surface:
-        return self.assets.block_images[peace - 2]
-
-    def render(self, delta: float) -> None:
-        self.surface.fill(Color.LightBlack)
+        return self.blocks.images[peace - 2]
+
+    def invalidate(self) -> None:
+        self.dirty = [self.surface.get_rect()]
+
+    def profile(self, profiler: FrameProfiler) -> None:
+        super().profile(profiler)
+        for name in ("update", "step", "tick", "activate_hold_peace", "calc_ghost_cursor", "move_on_x_axis", "move_on_y_axis",
+                     "rotate_peace", "drop_block", "lock_peace", "check_for_cleared_lines", "spawn_new_block"):
+            profiler.wrap(self.system, name, "system." + name)
+        if self.latency:
+            # Steps the system in place of `GameplaySystem.update`, timed as the same stage.
+            profiler.wrap(self.latency, "update", "system.update")
+
+        profiler.wrap(self.particles,           "update", "particles update")
+        profiler.wrap(self.particles,           "render", "particles render")
+        profiler.wrap(self.hard_drop_particles, "update", "hard drop update")
+        profiler.wrap(self.hard_drop_particles, "render", "hard drop render")
+        profiler.wrap(self.timeline,            "update", "timeline update")
+        for name in ("draw_tetris_field", "draw_next_block", "draw_hold_block", "draw_info_board", "compose"):
+            profiler.wrap(self, name)
+
+    def update(self, delta: float) -> None:
+        # Input is read every tick even when it is thrown away, so nothing queued while it could not apply acts later.
+        if self.player:
+            self.events.clear()
+            self.player.advance(self.system, delta)
+        else:
+            actions = self.controller.poll(delta)
+            if not self.system.is_running():
+                actions = []
+            if self.latency: self.latency.update(self.system, delta, actions, self.controller.stamps)
+            else:            self.system.update(delta, actions)
+
+        self.timeline.update(delta)
+        # Whole pixels, rect math truncates where blits round and a fractional field would leave stale rows behind.
+        self.board_offset_y = round(self.timeline.value("shake"))
 
-        # self.surface.blit(self.assets.misaka_image, (200,0))
-        if self.events.keys["space"]:
-            self.particles.distort()
-    
-        self.system.update(delta)
-
-        self.draw_clear_animation(delta)
-        
-        # self.move_board(delta)
         self.particles.update(delta)
-        self.particles.render(self.surface)
         self.hard_drop_particles.update(delta)
-        self.hard_drop_particles.render(self.surface)
 
-        self.draw_tetris_field(offset=13)
+    def render(self, alpha: float) -> list:
+        """
+        Redraws only what changed: the regions of re-rendered layers plus where anything that moves was last
+        frame and is now. Returns those rects for `pygame.display.update`.
+        """
+        self.draw_tetris_field()
         self.draw_next_block(24)
         self.draw_hold_block(7)
         self.draw_info_board()
+
+        sprites = self.get_peace_sprites()
+        screen  = self.surface.get_rect()
+
+        # Only rects over something in the overlay need it blitted back, and only those have to be merged so
+        # no pixel gets the alpha blended overlay twice. Most particles float over plain background. With
+        # thousands of particles tracking them costs more than redrawing everything.
+        if self.particles.count + self.hard_drop_particles.count > Constants.MAX_DIRTY_RECTS:
+            moving  = [screen]
+            plain   = []
+            covered = [screen]
+        else:
+            moving  = self.particles.rects(alpha) + self.hard_drop_particles.rects(alpha)
+            moving  = [moving[i] for i in screen.collidelistall(moving)]
+            moving += [image.get_rect(topleft=position) for image, position in sprites]
+            if self.system.paused:
+                moving.append(PAUSE_RECT)
+
+            content = self.chrome_rects + [surface.get_rect(topleft=position) for surface, position in self.layers()]
+            plain   = []
+            covered = []
+            for rect in self.dirty + self.previous + moving:
+                (plain if rect.collidelist(content) == -1 else covered).append(rect)
+            # Sprites can stick out above the screen during a shake, blit() would shift an area that starts off it.
+            covered = [rect.clip(screen) for rect in merge_rects(covered)]
+
+        dirty = plain + covered
+        for rect in dirty:
+            self.surface.fill(Color.LightBlack, rect)
+
+        # self.surface.blit(self.assets.misaka_image, (200,0))
+        self.particles.render(self.surface, alpha)
+        self.hard_drop_particles.render(self.surface, alpha)
+
+        for rect in covered:
+            self.surface.blit(self.overlay, rect, rect)
+        self.surface.blits(sprites, doreturn=False)
+
         self.draw_pause()
 
-    def move_board(self, delta : float) -> None:
-        if self.system.is_dropped_hard():
-            self.vel = 10
-
-        self.board_offset_y += self.vel * delta  * 2
-        self.vel += -5 * delta * 15
-
-        if self.board_offset_y < 0: self.board_offset_y = 0
-        if self.board_offset_y > 5: self.board_offset_y = 5
-
-    def draw_clear_animation(self, delta : float) -> None:
-        if self.system.clear_time:
-            self.new_block_remove_timer += delta
-
-            if self.new_block_remove_timer > 0.04:
-                self.new_block_remove_timer = 0
-                
-                for row in self.system.indices:
-                    self.system.tetris_field[row][self.block_in_row_to_remove] = 0
-                
-                self.block_in_row_to_remove += 1
-
-
-                if self.block_in_row_to_remove == Constants.COLS:
-                    self.block_in_row_to_remove = 0
-                    if len(self.system.indices) == 4:
-                        self.particles.boom()
-                    self.system.clear()
-
-                   
-
-    def draw_tetris_field(self, offset: int) -> None:
-        pygame.draw.rect(self.surface, Color.Grey, (BSIZE * offset - 2, BSIZE - 2 + self.board_offset_y, BSIZE * 10 + 4, BSIZE * 20 + 4), 1)
-
-        for i in range(Constants.ROWS):
-            for j in range(Constants.COLS):
-                if self.system.tetris_field[i][j]:
-                    self.surface.blit(self.get_image_for_block(self.system.tetris_field[i][j]), ((j + offset) * BSIZE, i * BSIZE + self.board_offset_y))
-
-        peace = self.system.get_current_peace()
-        for i in range(len(peace)):
-            for j in range(len(peace[i])):
-                if peace[i][j] == 1 and not self.system.clear_time:
-                    if (self.system.cursor[Constants.Y] + i) * BSIZE + self.board_offset_y >= BSIZE:
-                        self.surface.blit(
-                            self.get_image_for_block(Constants.VALUES[self.system.current_peace]), (
-                                (self.system.cursor[Constants.X] +
-                                j + offset) * BSIZE ,
-                                (self.system.cursor[Constants.Y] + i) * BSIZE + self.board_offset_y))
-                    self.surface.blit(self.assets.block_images[7], (
-                        (self.system.ghost_cursor[Constants.X] +
-                         j + offset) * BSIZE ,
-                        (self.system.ghost_cursor[Constants.Y] + i) * BSIZE - BSIZE + self.board_offset_y))
-
-        self.surface.blit(self.assets.logo_image, (BSIZE * 7, BSIZE * 1.5))
+        self.previous, self.dirty = moving, []
+        return dirty
+
+    def layers(self) -> list:
+        """ (surface, position) of every layer above the chrome. """
+        return [(self.field, self.field_pos)] + [(surface, position) for surface, position, _ in self.hud.values()]
+
+    def compose(self, rect: pygame.Rect) -> None:
+        """ Rebuilds `rect` of the overlay from the layers and marks it dirty. """
+        self.overlay.fill((0, 0, 0, 0), rect)
+        self.overlay.blit(self.chrome, rect, rect)
+        for surface, position in self.layers():
+            # Clip first, blit() does not move the destination when the source area starts outside the surface.
+            clip = rect.clip(surface.get_rect(topleft=position))
+            if clip:
+                self.overlay.blit(surface, clip, clip.move(-position[0], -position[1]))
+        self.dirty.append(rect)
+
+    def draw_hud(self, name: str, key, draw, position: tuple) -> None:
+        """ Calls `draw` for a new surface of the HUD element `name` only when its `key` changed. """
+        old = self.hud.get(name)
+        if old and old[2] == key:
+            return
+
+        surface = draw()
+        self.hud[name] = (surface, position, key)
+        rect = surface.get_rect(topleft=position)
+        if old:
+            rect.union_ip(old[0].get_rect(topleft=old[1]))
+        self.compose(rect)
+
+    def draw_chrome(self) -> None:
+        chrome, rects = self.chrome, self.chrome_rects
+        rects.append(pygame.draw.rect(chrome, Color.Grey, (BSIZE * FIELD_OFFSET - 2, BSIZE - 2, BSIZE * 10 + 4, BSIZE * 20 + 4), 1))
+        rects.append(chrome.blit(self.assets.logo_image, (BSIZE * 7, BSIZE * 1.5)))
+
+        for offset, label in ((24, "Next"), (7, "Hold")):
+            rects.append(pygame.draw.rect(chrome, Color.Grey, (offset * 32, 5 * 32, 32 * 5, 32 * 4), 1))
+            rects.append(chrome.blit(self.assets.text.render(self.assets.font_32, label, Color.Grey), (BSIZE * offset + 8, BSIZE * 5)))
+
+        for y, label in ((560, "Level"), (590, "Lines"), (620, "Time")):
+            rects.append(chrome.blit(self.assets.text.render(self.assets.font_32, label, Color.Grey), (BSIZE * 24 + 8,      y)))
+            rects.append(chrome.blit(self.assets.text.render(self.assets.font_32, ":",   Color.Grey), (BSIZE * 24 + 8 + 90, y)))
+
+        for y, label in ((2, "Best"), (10, "Score")):
+            rects.append(pygame.draw.rect(chrome, Color.Grey, (BSIZE * 24, BSIZE * y, BSIZE * 5, BSIZE * 2), 1))
+            rects.append(chrome.blit(self.assets.text.render(self.assets.font_32, label, Color.Grey), (BSIZE * 24 + 8, BSIZE * y + 2)))
+
+        self.overlay.blit(chrome, (0, 0))
+
+    def draw_tetris_field(self) -> None:
+        """
+        Re-renders the locked blocks, only when the board (or the clear wipe over its snapshot) changed since the
+        last call.
+        """
+        if self.cleared:
+            column = int(self.timeline.value("clear"))
+            key    = (self.clears, column, self.board_offset_y)
+        else:
+            key    = (self.system.board.version, self.board_offset_y)
+        if key == self.field_key:
+            return
+
+        old = self.field.get_rect(topleft=self.field_pos)
+        self.field_key = key
+        self.field_pos = (FIELD_OFFSET * BSIZE, self.board_offset_y)
+
+        cells = []
+        if self.cleared:
+            colors, rows = self.cleared
+            for i, row in enumerate(colors):
+                first = column if i in rows else 0
+                cells.extend((row[j] - 2, j, i) for j in range(first, Constants.COLS) if row[j])
+        else:
+            board = self.system.board
+            for i, mask in enumerate(board.masks):
+                if mask:
+                    row = board.colors[i]
+                    cells.extend((row[j] - 2, j, i) for j in range(Constants.COLS) if row[j])
+
+        self.field.fill((0, 0, 0, 0))
+        self.field.blits(self.blocks.batch(cells), doreturn=False)
+
+        self.compose(old.union(self.field.get_rect(topleft=self.field_pos)))
+
+    def get_peace_sprites(self) -> list:
+        """
+        (image, position) of the falling peace and its ghost, drawn straight to the screen every frame. The ghost is
+        left out while cleared rows are wiped, it rests on the compacted board and not on the rows still shown.
+        """
+        sprites = []
+        image = self.get_image_for_block(Constants.VALUES[self.system.current_peace])
+        for j, i in self.system.get_current_peace().cells:
+            if (self.system.cursor[Constants.Y] + i) * BSIZE + self.board_offset_y >= BSIZE:
+                sprites.append((image, (
+                    (self.system.cursor[Constants.X] + j + FIELD_OFFSET) * BSIZE,
+                    (self.system.cursor[Constants.Y] + i) * BSIZE + self.board_offset_y)))
+            if not self.cleared:
+                sprites.append((self.blocks.images[7], (
+                    (self.system.ghost_cursor[Constants.X] + j + FIELD_OFFSET) * BSIZE,
+                    (self.system.ghost_cursor[Constants.Y] + i) * BSIZE - BSIZE + self.board_offset_y)))
+        return sprites
 
     def draw_info_board(self) -> None:
+        level, lines, time = self.system.level, self.system.cleared_lines, int(self.system.total_time)
+
+        text, font = self.assets.text, self.assets.font_32
 
-        self.surface.blit(self.assets.font_32.render(
-            "Level", True, Color.Grey), (BSIZE * 24+8, 560))
-        self.surface.blit(self.assets.font_32.render(
-            ":", True, Color.Grey), (BSIZE * 24 + 8 + 90, 560))
-        self.surface.blit(self.assets.font_32.render(
-            str(self.system.level), True, Color.LightRed), (BSIZE * 24+8 + 110, 560))
-
-        self.surface.blit(self.assets.font_32.render(
-            "Lines", True, Color.Grey), (BSIZE * 24+8, 590))
-        self.surface.blit(self.assets.font_32.render(
-            ":", True, Color.Grey), (BSIZE * 24+8 + 90, 590))
-        self.surface.blit(self.assets.font_32.render(
-            str(self.system.cleared_lines), True, Color.LightRed), (BSIZE * 24+8 + 110, 590))
-
-        self.surface.blit(self.assets.font_32.render(
-            "Time", True, Color.Grey), (BSIZE * 24+8, 620))
-        self.surface.blit(self.assets.font_32.render(
-            ":", True, Color.Grey), (BSIZE * 24+8 + 90, 620))
-        self.surface.blit(self.assets.font_32.render("{}:{}".format(int(self.system.total_time // 60), int(self.system.total_time % 60)),
-                                                 True, Color.LightBlue), (BSIZE * 24 + 8 + 110, 620))
+        self.draw_hud("level", level, lambda: text.render(font, str(level), Color.LightRed), (BSIZE * 24 + 8 + 110, 560))
+        self.draw_hud("lines", lines, lambda: text.render(font, str(lines), Color.LightRed), (BSIZE * 24 + 8 + 110, 590))
+        self.draw_hud("time",  time,  lambda: text.render(font, "{}:{}".format(time // 60, time % 60), Color.LightBlue), (BSIZE * 24 + 8 + 110, 620))
 
         self.draw_score()
 
     def draw_next_block(self, offset: int) -> None:
-        self.draw_block(self.system.get_next_peace(), self.system.next_peace, offset)
-        self.surface.blit(self.assets.font_32.render("Next", True, Color.Grey), (BSIZE * offset + 8, BSIZE * 5))
+        peace = self.system.next_peace
+        self.draw_hud("next", peace, lambda: self.draw_block(self.system.get_next_peace(), peace), (offset * BSIZE, 5 * BSIZE))
 
     def draw_hold_block(self, offset: int) -> None:
-        self.draw_block(self.system.get_hold_peace(),
-                        self.system.hold_peace, offset)
-        self.surface.blit(self.assets.font_32.render("Hold", True, Color.Grey), (BSIZE * offset + 8, BSIZE * 5))
+        peace = self.system.hold_peace
+        self.draw_hud("hold", peace, lambda: self.draw_block(self.system.get_hold_peace(), peace), (offset * BSIZE, 5 * BSIZE))
 
-    def draw_block(self, peace: list, block_name: str, offset: int) -> None:
-        pygame.draw.rect(self.surface, Color.Grey, (offset * 32, 5 * 32, 32 * 5, 32 * 4), 1)
+    def draw_block(self, peace: PeaceShape, block_name: str) -> Surface:
+        """ Renders a peace into a surface the size of a preview box. """
+        surface = Surface((BSIZE * 5, BSIZE * 4), pygame.SRCALPHA)
         if not peace:
-            return
+            return surface
 
-        for i in range(len(peace)):
-            for j in range(len(peace[i])):
-                if peace[i][j]:
-                    self.surface.blit(self.get_image_for_block(Constants.VALUES[block_name]),
-                                     ((j + offset) * BSIZE + Constants.BLOCK_DISPLAY_OFFSETS_X[block_name],
-                                      ((i + 4) * BSIZE) + Constants.BLOCK_DISPLAY_OFFSETS_Y[block_name]))
+        image = self.get_image_for_block(Constants.VALUES[block_name])
+        surface.blits([(image, (j * BSIZE + Constants.BLOCK_DISPLAY_OFFSETS_X[block_name],
+                                (i - 1) * BSIZE + Constants.BLOCK_DISPLAY_OFFSETS_Y[block_name])) for j, i in peace.cells], doreturn=False)
+        return surface
 
     def draw_score(self) -> None:
+        score = str(self.system.score).zfill(9)
 
-        score = str(self.system.score)
-        while len(score) < 9:
-            score = "0" + score
-
-        pygame.draw.rect(self.surface, Color.Grey, (BSIZE * 24,
-                         BSIZE * 2, BSIZE * 5, BSIZE * 2), 1)
-        self.surface.blit(self.assets.font_32.render(
-            "Best", True, Color.Grey),      (BSIZE * 24 + 8, BSIZE * 2 + 2))
-        self.surface.blit(self.assets.font_32.render(
-            score, True, Color.LightRed),   (BSIZE * 24 + 8, BSIZE * 3))
+        text, font = self.assets.text, self.assets.font_32
 
-        pygame.draw.rect(self.surface, Color.Grey, (BSIZE * 24,
-                         BSIZE * 10, BSIZE * 5, BSIZE * 2), 1)
-        self.surface.blit(self.assets.font_32.render(
-            "Score", True, Color.Grey),     (BSIZE * 24 + 8, BSIZE * 10 + 2))
-        self.surface.blit(self.assets.font_32.render(
-            score, True, Color.LightGreen), (BSIZE * 24 + 8, BSIZE * 11))
+        self.draw_hud("best",  score, lambda: text.render(font, score, Color.LightRed),   (BSIZE * 24 + 8, BSIZE * 3))
+        self.draw_hud("score", score, lambda: text.render(font, score, Color.LightGreen), (BSIZE * 24 + 8, BSIZE * 11))
 
     def draw_pause(self) -> None:
         if self.system.paused:
-            pygame.draw.rect(self.surface, (40, 40, 40),
-                             (8 * BSIZE, 250, 10 * 32, 200))
-            self.surface.blit(self.text["Pause"],
-                             (8 * BSIZE + 3 * 32 + 12, 310))
-            self.surface.blit(self.text["Pause1"], (8 * BSIZE + 20, 360))
+            pygame.draw.rect(self.surface, (40, 40, 40), PAUSE_RECT)
+            self.surface.blit(self.assets.text.render(self.assets.font_48, "Pause", Color.White), (8 * BSIZE + 3 * 32 + 12, 310))
+            self.surface.blit(self.assets.text.render(self.assets.font_32, "Press [P] to unpause", Color.White), (8 * BSIZE + 20, 360))
@@ -11,7 +11,47 @@ Distributed under the MIT software license, see the accompanying file LICENCE or
 ---------------------------------------------------------------------------------------------------------------------------------------
 """
 
+from pygame       import Rect
+from src.profiler import FrameProfiler
+
+
+def merge_rects(rects : list) -> list:
+    """ Unions overlapping rects until none overlap, so alpha blended layers are blitted over every pixel once. """
+    merged = []
+    for rect in rects:
+        rect  = Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
 class Screen(object):
 
+    # Names of the `Assets` the screen draws with, preloaded behind the splash screen before it is built.
+    ASSETS : tuple = ()
+
     def __init__(self) -> None:
-        pass
\ No newline at end of file
+        pass
+
+    def update(self, delta : float) -> None:
+        """ Advances the screen by one fixed logic tick of `delta` seconds. """
+        pass
+
+    def render(self, alpha : float) -> list:
+        """
+        Draws the screen, `alpha` is how far (0 - 1) the frame is between the last tick and the next one. Returns the
+        rects that changed, or None when the whole screen has to be flipped.
+        """
+        return None
+
+    def profile(self, profiler : FrameProfiler) -> None:
+        """ Registers the stages worth timing with a `FrameProfiler`. """
+        profiler.wrap(self, "update", "screen update")
+        profiler.wrap(self, "render", "screen render")
+
+    def invalidate(self) -> None:
+        """ The window contents were lost, the next `render` has to redraw everything. """
+        pass
@@ -0,0 +1,54 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/screens/splash.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import pygame
+
+from pygame         import Surface, Rect
+
+from src.assets     import Assets
+from src.constants  import Constants
+from src.colors     import Color
+
+from src.screens.screen import Screen
+
+BAR_SIZE = (400, 8)
+
+class SplashScreen(Screen):
+    """ Shown while `Assets` loads a screen's manifest in the background, draws the icon and a progress bar. """
+
+    def __init__(self, surface : Surface, assets : Assets, names : tuple) -> None:
+        self.surface  : Surface = surface
+        self.assets   : Assets  = assets
+        self.names    : tuple   = names
+        self.progress : float   = 0
+        self.icon     : Surface = pygame.image.load("./assets/icon.png").convert_alpha()
+        self.bar      : Rect    = Rect((0, 0), BAR_SIZE)
+
+        self.bar.center = (Constants.SCREEN_SIZE[0] // 2, Constants.SCREEN_SIZE[1] // 2 + self.icon.get_height())
+        self.assets.preload(names)
+
+    def done(self) -> bool:
+        return self.assets.ready(self.names)
+
+    def update(self, delta : float) -> None:
+        self.progress = self.assets.poll()
+
+    def render(self, alpha : float) -> list:
+        self.surface.fill(Color.LightBlack)
+        self.surface.blit(self.icon, self.icon.get_rect(center=(Constants.SCREEN_SIZE[0] // 2, Constants.SCREEN_SIZE[1] // 2)))
+
+        fill = self.bar.copy()
+        fill.width = int(self.bar.width * self.progress)
+        pygame.draw.rect(self.surface, Color.Grey,    self.bar, 1)
+        pygame.draw.rect(self.surface, Color.LogoRed, fill)
+        return None
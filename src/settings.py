@@ -18,13 +18,10 @@ from src.assets     import Assets
 from src.events     import EventHandler
 from enum           import Enum
 
-from src.states import GlobalStates
+from src.sfx        import SoundEffects
+from src.states     import GlobalStates, Settings
 
 
-class Settings:
-    Level : int  = 0
-    Music : bool = False
-    Sound : bool = True
 class SettingsCursor(Enum):
     Level = 0
     Music = 1
@@ -33,10 +30,13 @@ class SettingsCursor(Enum):
 
 class SettingsScreen(object):
 
-    def __init__(self, screen : Surface, assets : Assets, event_handler : EventHandler) -> None:
+    ASSETS : tuple = ("logo_image", "select_sound", "enter_sound", "font_32", "font_48", "font_64")
+
+    def __init__(self, screen : Surface, assets : Assets, event_handler : EventHandler, sfx : SoundEffects) -> None:
         self.screen    : Surface                  = screen
         self.assets    : Assets                   = assets
         self.events    : EventHandler             = event_handler
+        self.sfx       : SoundEffects             = sfx
 
         self.cursor    : SettingsCursor           = SettingsCursor.Level
         self.particles : BackgroundParticleSystem = BackgroundParticleSystem(100, 100)
@@ -56,7 +56,7 @@ class SettingsScreen(object):
                 self.cursor = SettingsCursor.Back if self.cursor.value + 1 > SettingsCursor.Back.value else SettingsCursor(self.cursor.value + 1)
             else:
                 Settings.Level += 5
-            self.assets.channel1.play(self.assets.select_sound)
+            self.sfx.play("select")
 
         if self.events.key("up"):
             if Settings.Level < 5:
@@ -64,29 +64,29 @@ class SettingsScreen(object):
             else:
                 Settings.Level -= 5
             self.cursor = SettingsCursor(self.cursor.value - 1)
-            self.assets.channel1.play(self.assets.select_sound)
+            self.sfx.play("select")
 
         if self.cursor == SettingsCursor.Level and self.events.key("left"):
             if Settings.Level == 0:
                 return
             Settings.Level -= 1
-            self.assets.channel1.play(self.assets.select_sound)
+            self.sfx.play("select")
 
         if self.cursor == SettingsCursor.Level and self.events.key("right"):
             if Settings.Level == 9:
                 return
             Settings.Level += 1
-            self.assets.channel1.play(self.assets.select_sound)
+            self.sfx.play("select")
 
         
 
         if self.cursor == SettingsCursor.Back and self.events.key("enter"):
             GlobalStates.Screen = "MainMenu"
-            self.assets.channel1.play(self.assets.enter_sound)
+            self.sfx.play("enter")
 
         if self.cursor == SettingsCursor.Back and self.events.key("up"):
             self.cursor = SettingsCursor.Level
-            self.assets.channel1.play(self.assets.select_sound)
+            self.sfx.play("select")
 
         
 
@@ -0,0 +1,102 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/sfx.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import time
+import pygame
+
+from pygame.mixer   import Channel
+from src.assets     import Assets
+from src.bus        import EventBus, GameEvent
+from src.states     import Settings
+
+
+class Effect(object):
+    """ How a sound effect competes for voices: `priority` against other effects, `voices` and `interval` against itself. """
+
+    def __init__(self, asset : str, priority : int = 0, voices : int = 1, interval : float = 0) -> None:
+        self.asset    : str   = asset       # `Assets` attribute of the sound
+        self.priority : int   = priority    # may steal voices from lower priorities when the pool is full
+        self.voices   : int   = voices      # playing at once, the oldest one is restarted past the limit
+        self.interval : float = interval    # seconds, repeats closer than this are dropped
+
+
+EFFECTS : dict = {
+    "select" : Effect("select_sound", priority=0, voices=2, interval=0.05),
+    "enter"  : Effect("enter_sound",  priority=2, voices=1),
+    "drop"   : Effect("drop_sound",   priority=1, voices=2, interval=0.05),
+    "clear"  : Effect("clear_sound",  priority=3, voices=1),
+}
+
+
+class SoundEffects(object):
+    """
+    Plays the `EFFECTS` by name over a pool of mixer channels. A free channel is used when there is one, otherwise
+    the lowest priority voice (oldest first) that does not outrank the new effect is cut. Nothing plays while
+    `Settings.Sound` is off.
+
+    `bind` subscribes effects to an `EventBus`, the gameplay rules publish events and never touch the mixer.
+    """
+
+    def __init__(self, assets : Assets, channels : int = 8, effects : dict = None) -> None:
+        self.assets  : Assets = assets
+        self.effects : dict   = effects or EFFECTS
+        self.pool    : list   = []
+        self.voices  : dict   = {}    # channel index: (effect name, priority, start time)
+        self.last    : dict   = {}    # effect name: start time
+
+        if pygame.mixer.get_init():
+            pygame.mixer.set_num_channels(max(channels, pygame.mixer.get_num_channels()))
+            self.pool = [Channel(i) for i in range(channels)]
+
+
+    def bind(self, bus : EventBus, event : GameEvent, name : str) -> None:
+        bus.subscribe(event, lambda **payload: self.play(name))
+
+
+    def play(self, name : str) -> Channel:
+        """ Starts the effect, returns its channel or None when it was muted, rate limited or outranked. """
+        effect = self.effects[name]
+        now    = time.monotonic()
+        if not Settings.Sound or not self.pool:
+            return None
+        if name in self.last and now - self.last[name] < effect.interval:
+            return None
+
+        playing = self.playing()
+        same    = [index for index in playing if self.voices[index][0] == name]
+
+        if len(same) >= effect.voices:
+            index = min(same, key=lambda index: self.voices[index][2])
+        elif len(playing) < len(self.pool):
+            index = next(index for index in range(len(self.pool)) if index not in playing)
+        else:
+            victims = [index for index in playing if self.voices[index][1] <= effect.priority]
+            if not victims:
+                return None
+            index = min(victims, key=lambda index: self.voices[index][1:])
+
+        channel = self.pool[index]
+        channel.play(getattr(self.assets, effect.asset))
+        self.voices[index] = (name, effect.priority, now)
+        self.last[name]    = now
+        return channel
+
+
+    def playing(self) -> list:
+        return [index for index in self.voices if self.pool[index].get_busy()]
+
+
+    def stop(self) -> None:
+        for channel in self.pool:
+            channel.stop()
+        self.voices.clear()
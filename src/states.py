@@ -2,6 +2,11 @@
 class GlobalStates:
     Running      : bool  = True
     Screen       : str   = "Gameplay"
-    FIRST_MOVE   : list  = [ False, False ]
+
+
+class Settings:
+    Level : int  = 0
+    Music : bool = False
+    Sound : bool = True
 
 
@@ -9,36 +9,51 @@
 Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
 """
 
-import random
-
-from src.peaces     import TETRIS_PEACES
-from src.assets     import Assets
+from src.peaces     import PEACE_SHAPES, PeaceShape
+from src.randomizer import PeaceSource
+from src.bitboard   import Bitboard
 from src.constants  import Constants
-from src.events     import EventHandler
-from src.states     import GlobalStates
+from src.actions    import Action
+from src.bus        import EventBus, GameEvent
 
 
 class GameplaySystem(object):
-
-    def __init__(self, events : EventHandler, assets : Assets) -> None:
-        self.events : EventHandler = events
-        self.assets : Assets       = assets
+    """
+    Tetris rules without any pygame dependency. Input arrives as `Action`s through `step()`, time through `tick()`,
+    and everything worth reacting to (locks, clears, game over...) is published on `bus` for the presentation
+    layer to turn into sounds and particles.
+
+    Full rows are cleared in the tick that locks the peace, the game never waits for an animation. `Clear` is
+    emitted while the rows are still on the board, so listeners can snapshot them for the clear effect.
+    `auto_reset` starts a new game on game over, otherwise the system stops in the `over` state.
+    Peaces come from a `PeaceSource` seeded with `seed` and using the `generator` randomizer ("uniform", "bag",
+    "history"), so the same seed and inputs always replay the same game.
+    """
+
+    def __init__(self, bus : EventBus = None, auto_reset : bool = True, seed : int = None, generator : str = "uniform") -> None:
+        self.source         : PeaceSource = PeaceSource(seed, generator, Constants.PREVIEW)
+        self.bus            : EventBus = bus if bus else EventBus()
+        self.recorder                  = None     # Optional `ReplayWriter`, sees every applied action and tick.
+        self.auto_reset     : bool     = auto_reset
 
         self.reset()
 
 
     def reset(self) -> None:
-        self.tetris_field   : list  = [[0 for _ in range(Constants.COLS)] for _ in range(Constants.ROWS)]
+        self.board          : Bitboard = Bitboard(Constants.ROWS, Constants.COLS)
+        self.tetris_field   : list  = self.board.field
 
-        self.move_timers    : dict  = { "down": 0,  "left": 0,  "right": 0 }
-        self.next_peace     : str   = random.choice(list(TETRIS_PEACES.keys())) 
+        self.move_timers    : dict  = { "down": 0 }
+        self.next_peace     : str   = self.source.peek() 
         self.ghost_cursor   : list  = [ 0, 0 ] 
+        self.ghost_key      : tuple = None
        
         self.hold_peace     : str   = None 
        
         self.paused         : bool  = False
-        self.pause_time     : float = 0
+        self.over           : bool  = False
         self.total_time     : float = 0
+        self.ticks          : int   = 0
 
         self.level          : int   = 0
         self.fall_timer     : float = 1
@@ -46,194 +61,182 @@ class GameplaySystem(object):
         self.score          : int   = 0 
         self.inc_level      : int   = 0  
 
-
-        self.clear_time     : bool  = False
-
         self.indices        : list  = []
-        self.block_ids      : list  = [] 
-
-        self.dropped_hard   : bool  = False
-        self.dropped_hard_cursor = []
 
         self.spawn_new_block()
 
 
-    def is_dropped_hard(self) -> bool:
-        if self.dropped_hard:
-            self.dropped_hard = False
-            return True
-        return False
-
     def spawn_new_block(self) -> None:
-        self.current_peace   : str  = self.next_peace
+        self.current_peace   : str  = self.source.next()
         self.rotation        : int  = 0  
         self.cursor          : list = self.default_cursor()  
-        self.next_peace      : str  = random.choice(list(TETRIS_PEACES.keys()))  
+        self.next_peace      : str  = self.source.peek()  
 
         self.move_timers["down"]    = 0   
         self.can_hold   = True   
         
         if self.check_for_end():  
-            self.reset()   
+            self.end_game()
+            return
+
+        self.bus.emit(GameEvent.Spawn, peace=self.current_peace)
+
+
+    def end_game(self) -> None:
+        self.bus.emit(GameEvent.GameOver, score=self.score, lines=self.cleared_lines, level=self.level, ticks=self.ticks)
+
+        if self.auto_reset: self.reset()
+        else:               self.over = True
 
 
     def default_cursor(self) -> list: 
-        return [ Constants.COLS // 2 - len(self.get_current_peace()[0]) // 2, 0 ]
+        return [ Constants.COLS // 2 - self.get_current_peace().width // 2, 0 ]
+
 
+    def get_next_peace(self) -> PeaceShape:
+        return PEACE_SHAPES[self.next_peace][0]
 
-    def get_next_peace(self) -> list:
-        return TETRIS_PEACES[self.next_peace][0]
 
+    def get_current_peace(self) -> PeaceShape:
+        return PEACE_SHAPES[self.current_peace][self.rotation]
 
-    def get_current_peace(self) -> list:
-        return TETRIS_PEACES[self.current_peace][self.rotation]
 
+    def get_preview(self, count : int = None) -> list:
+        return [PEACE_SHAPES[name][0] for name in self.source.preview(count)]
 
-    def get_hold_peace(self) -> list:
-        return None if self.hold_peace == None else TETRIS_PEACES[self.hold_peace][0]
+
+    def get_hold_peace(self) -> PeaceShape:
+        return None if self.hold_peace == None else PEACE_SHAPES[self.hold_peace][0]
 
 
     def check_for_end(self) -> bool:
-        peace = self.get_current_peace()
-        for i in range(len(peace)):
-            for j in range(len(peace[i])):
-                if peace[i][j] and self.tetris_field[self.cursor[Constants.Y] + i][self.cursor[Constants.X] + j]:
-                    return True
-        return False
+        return self.board.collides(self.get_current_peace(), self.cursor[Constants.X], self.cursor[Constants.Y])
 
     
-    def update(self, delta : float) -> None:
-        if self.paused or self.clear_time:
+    def is_running(self) -> bool:
+        return not (self.paused or self.over)
+
+
+    def update(self, delta : float, actions : list = ()) -> None:
+        """ Runs one frame: applies the frame's actions in order, then advances time. """
+        for action in actions:
+            self.step(action)
+        self.tick(delta)
+
+
+    def step(self, action : Action) -> None:
+        if not self.is_running():
+            return
+
+        if self.recorder:
+            self.recorder.action(action)
+
+        if   action == Action.Hold:      self.activate_hold_peace()
+        elif action == Action.HardDrop:  self.drop_block()
+        elif action == Action.Left:      self.move_on_x_axis("left")
+        elif action == Action.Right:     self.move_on_x_axis("right")
+        elif action == Action.SoftDrop:  self.move_on_y_axis()
+        elif action == Action.RotateCW:  self.rotate_peace(True)
+        elif action == Action.RotateCCW: self.rotate_peace(False)
+
+        self.calc_ghost_cursor()
+
+
+    def tick(self, delta : float) -> None:
+        if not self.is_running():
             return
 
-        self.total_time += delta
+        if self.recorder:
+            self.recorder.tick(delta)
+
+        self.total_time          += delta
+        self.ticks               += 1
+        self.move_timers["down"] += delta
 
-        self.activate_hold_peace()                  # Step 1: Check if hold peace is activated.
-        self.calc_ghost_cursor()                    # Step 2: Update ghost cursor.
-        self.drop_block()                           # Step 3: Check if hard drop was used.
-        self.move_on_x_axis(delta)                  # Step 4: Check for movement on x axis.
-        self.move_on_y_axis(delta)                  # Step 5: Check for movement on y axis.
-        self.rotate_peace()                         # Step 6: Check for rotation.
-        self.check_for_cleared_lines()              # Step 7: Check if there is a match.
+        if self.move_timers["down"] >= self.fall_timer:
+            self.move_on_y_axis()
+
+        self.calc_ghost_cursor()
 
 
     def activate_hold_peace(self) -> None:
-        if not self.events.keys["c"] or not self.can_hold:
+        if not self.can_hold:
             return
 
-        self.events.keys["c"] = False 
         self.current_peace, self.hold_peace = self.hold_peace, self.current_peace
+        old_cursor, old_rotation = self.cursor, self.rotation
+        self.rotation = 0
             
         if self.current_peace:  self.cursor = self.default_cursor()
         else:                   self.spawn_new_block()
 
+        if self.over:
+            return
+
         if self.check_for_end():
             self.current_peace, self.hold_peace = self.hold_peace, self.current_peace
+            self.cursor, self.rotation = old_cursor, old_rotation
             return
 
-        self.rotation = 0
         self.can_hold = False
+        self.bus.emit(GameEvent.Hold, peace=self.hold_peace)
 
     
     def move_cusror_y(self, cursor : list):
-        while not (self.check_collision_y(cursor) or (cursor[Constants.Y] + len(self.get_current_peace()) > Constants.ROWS)):
-            cursor[Constants.Y] += 1
+        cursor[Constants.Y] += self.board.drop_distance(self.get_current_peace(), cursor[Constants.X], cursor[Constants.Y]) + 1
 
 
     def calc_ghost_cursor(self) -> None:
+        key = (self.current_peace, self.rotation, self.cursor[Constants.X], self.cursor[Constants.Y], self.board.version)
+        if key == self.ghost_key:
+            return
+
+        self.ghost_key    = key
         self.ghost_cursor = self.cursor.copy()
         self.move_cusror_y(self.ghost_cursor)
 
 
     def drop_block(self) -> None: 
-        if not self.events.keys["space"]:
-            return
-        
-        self.events.keys["space"] = False
-        
-
         self.move_cusror_y(self.cursor)
+        self.bus.emit(GameEvent.HardDrop, peace=self.current_peace, cursor=[self.cursor[Constants.X], self.cursor[Constants.Y] - 1])
 
-        peace = self.get_current_peace()
-        for i in range(len(peace)):
-            for j in range(len(peace[i])):
-                if peace[i][j]:
-                    self.tetris_field[self.cursor[Constants.Y] + i - 1][self.cursor[Constants.X] + j] = Constants.VALUES[self.current_peace]
-        
-        self.spawn_new_block()
-        self.assets.channel1.play(self.assets.drop_sound)
-        self.dropped_hard = True
-        self.dropped_hard_cursor = self.ghost_cursor.copy()
+        self.lock_peace()
 
 
-    def move_on_y_axis(self, delta : float) -> None:
-        self.move_timers["down"] += delta
-        if not (self.move_timers["down"] >= self.fall_timer or (self.events.keys["down"] and self.move_timers["down"] >= 0.04)):
-            return
-
+    def move_on_y_axis(self) -> None:
         self.move_timers["down"]  = 0
         self.cursor[Constants.Y] += 1
 
-        if not (self.check_collision_y(self.cursor) or (self.cursor[Constants.Y] + len(self.get_current_peace()) > Constants.ROWS)):
+        if not (self.check_collision_y(self.cursor) or (self.cursor[Constants.Y] + self.get_current_peace().height > Constants.ROWS)):
             return
 
-        peace = self.get_current_peace()
-        for i in range(len(peace)):
-            for j in range(len(peace[i])):
-                if peace[i][j]:
-                    self.tetris_field[self.cursor[Constants.Y] + i - 1][self.cursor[Constants.X] + j] = Constants.VALUES[self.current_peace]
+        self.lock_peace()
 
-        self.spawn_new_block()
-        self.assets.channel1.play(self.assets.drop_sound)
 
+    def lock_peace(self) -> None:
+        """ Locks the peace one row above the cursor, where it was before the colliding move, then spawns the next one. """
+        cursor = [self.cursor[Constants.X], self.cursor[Constants.Y] - 1]
+        self.board.place(self.get_current_peace(), cursor[Constants.X], cursor[Constants.Y], Constants.VALUES[self.current_peace])
+        self.bus.emit(GameEvent.Lock, peace=self.current_peace, cursor=cursor)
 
-    def move_on_x_axis(self, delta : float) -> None:
-        if not self.events.keys["left"] and not self.events.keys["right"]:
-            return
+        self.check_for_cleared_lines()
+        self.spawn_new_block()
 
-        side = "left" if self.events.keys["left"] else "right"
-        self.move_timers[side] += delta
 
-        #
-        # TODO: FIX MOVE TIMERS
-        #
-        if not (GlobalStates.FIRST_MOVE[side == "right"] or self.move_timers[side] > Constants.DAS):
-            return
-
-        GlobalStates.FIRST_MOVE[side == "right"] = False
+    def move_on_x_axis(self, side : str) -> None:
         if not self.check_collision_x(side):
             self.cursor[Constants.X] += Constants.MOVE_DIR[side]
 
-        self.move_timers[side] = 0
-
 
     def check_collision_x(self, side : str) -> bool:
-        peace = self.get_current_peace()
-        for i in range(len(peace)):
-            for j in range(len(peace[i])):
-                if side == "left" and peace[i][j] and (self.cursor[Constants.X] + j - 1 < 0 or self.tetris_field[self.cursor[Constants.Y] + i][self.cursor[Constants.X] + j - 1]):
-                    return True
-                if side == "right" and peace[i][j] and (self.cursor[Constants.X] + j + 1 == Constants.COLS or self.tetris_field[self.cursor[Constants.Y] + i][self.cursor[Constants.X] + j + 1]):
-                    return True
-        return False
+        return self.board.collides(self.get_current_peace(), self.cursor[Constants.X] + Constants.MOVE_DIR[side], self.cursor[Constants.Y])
 
 
     def check_collision_y(self, cursor : list) -> bool:
-        peace = self.get_current_peace()
-        for i in range(len(peace)):
-            for j in range(len(peace[i])):
-                if peace[i][j] and (cursor[Constants.Y] + i == Constants.ROWS or self.tetris_field[cursor[Constants.Y] + i][cursor[Constants.X] + j]):
-                    return True
-        return False
-
-
-    def rotate_peace(self) -> None:
-        if not self.events.keys["up"] and not self.events.keys["z"]:
-            return
+        return self.board.collides(self.get_current_peace(), cursor[Constants.X], cursor[Constants.Y])
 
-        if self.events.keys["up"]: side = True ; self.events.keys["up"] = False
-        if self.events.keys["z" ]: side = False; self.events.keys["z" ] = False
 
+    def rotate_peace(self, side : bool) -> None:
         old_rotation = self.rotation
         
         if side: self.rotation = 0 if self.rotation + 1 > 3 else self.rotation + 1 # Rotate clockwise
@@ -241,47 +244,34 @@ class GameplaySystem(object):
 
         peace = self.get_current_peace()
 
-        if self.cursor[Constants.Y] + len(peace) > Constants.ROWS:
+        if self.cursor[Constants.Y] + peace.height > Constants.ROWS:
             self.rotation = old_rotation
             return
 
         old_x = self.cursor[Constants.X]
 
         if (self.cursor[Constants.X] < 0):                              self.cursor[Constants.X] = 0
-        elif self.cursor[Constants.X] + len(peace[0]) > Constants.COLS: self.cursor[Constants.X] = Constants.COLS - len(peace[0]) 
+        elif self.cursor[Constants.X] + peace.width > Constants.COLS:   self.cursor[Constants.X] = Constants.COLS - peace.width 
 
-        for i in range(len(peace)):
-            for j in range(len(peace[i])):
-                if self.tetris_field[self.cursor[Constants.Y] + i][self.cursor[Constants.X] + j] and peace[i][j]:
-                    self.rotation            = old_rotation
-                    self.cursor[Constants.X] = old_x
-                    return
+        if self.board.collides(peace, self.cursor[Constants.X], self.cursor[Constants.Y]):
+            self.rotation            = old_rotation
+            self.cursor[Constants.X] = old_x
 
 
     def check_for_cleared_lines(self) -> None:
-        if self.clear_time:
-            return
-
-        for i in range(Constants.ROWS):
-            if all(list(self.tetris_field[i])):
-                self.indices.append(i)
+        self.indices = self.board.full_rows()
         
         if len(self.indices):
-            self.clear_time = True
-            self.assets.channel1.play(self.assets.clear_sound)
             self.update_score(len(self.indices))
             self.update_level()
+            self.bus.emit(GameEvent.Clear, rows=self.indices, score=self.score, level=self.level)
+            self.clear()
 
 
     def clear(self) -> None:
-        self.clear_time = False
-                    
-        for index in self.indices:
-            for i in range(index, 0, -1):
-                self.tetris_field[i] = self.tetris_field[i - 1]
-                self.tetris_field[0] = [0 for _ in range(Constants.COLS)]
-        
+        self.board.remove_rows(self.indices)
         self.indices = []
+        self.calc_ghost_cursor()
 
     def update_score(self, cleared : int) -> None:
         self.cleared_lines += cleared
@@ -0,0 +1,81 @@
+"""
+---------------------------------------------------------------------------------------------------------------------------------------
+@file       src/text.py
+@author     Milos Milicevic (milosh.mkv@gmail.com)
+
+@version    0.1
+@date       2022-04-28
+@copyright 	Copyright (c) 2022
+
+Distributed under the MIT software license, see the accompanying file LICENCE or http://www.opensource.org/licenses/mit-license.php.
+---------------------------------------------------------------------------------------------------------------------------------------
+"""
+
+import pygame
+
+from collections  import OrderedDict
+from pygame       import Surface
+from pygame.font  import Font
+
+
+class DigitAtlas(object):
+    """
+    The glyphs of `CHARS` rendered once for a font and color. Counters are built by blitting glyphs side by side,
+    which skips the rasterizer and matches `Font.render` for fonts without kerning between digits.
+    """
+
+    CHARS : str = "0123456789:"
+
+    def __init__(self, font : Font, color : tuple, antialias : bool = True) -> None:
+        self.glyphs : dict = { char: font.render(char, antialias, color) for char in self.CHARS }
+        self.height : int  = max(glyph.get_height() for glyph in self.glyphs.values())
+
+
+    def render(self, text : str) -> Surface:
+        glyphs  = [self.glyphs[char] for char in text]
+        surface = Surface((sum(glyph.get_width() for glyph in glyphs), self.height), pygame.SRCALPHA)
+
+        x = 0
+        for glyph in glyphs:
+            surface.blit(glyph, (x, 0))
+            x += glyph.get_width()
+        return surface
+
+
+class TextCache(object):
+    """ Bounded LRU of rendered strings keyed on (font, text, color, antialias), numbers go through a `DigitAtlas`. """
+
+    def __init__(self, capacity : int = 256) -> None:
+        self.capacity : int         = capacity
+        self.surfaces : OrderedDict = OrderedDict()
+        self.atlases  : dict        = {}
+        self.hits     : int         = 0
+        self.misses   : int         = 0
+
+
+    def render(self, font : Font, text : str, color : tuple, antialias : bool = True) -> Surface:
+        if text and all(char in DigitAtlas.CHARS for char in text):
+            # Counters rarely repeat a value, building them from the atlas is cheap and keeps them out of the LRU.
+            return self.atlas(font, color, antialias).render(text)
+
+        key     = (font, text, color, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+
+    def atlas(self, font : Font, color : tuple, antialias : bool = True) -> DigitAtlas:
+        key = (font, color, antialias)
+        if key not in self.atlases:
+            self.atlases[key] = DigitAtlas(font, color, antialias)
+        return self.atlases[key]